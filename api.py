@@ -0,0 +1,184 @@
+# api.py
+# API HTTP (FastAPI) com os mesmos filtros e agregações do dashboard, sem Streamlit.
+#
+# Usa o mesmo motor de consulta (cubo.montar_motor) e a mesma série do app. Respostas em
+# JSON por padrão ou Arrow IPC (stream) com ?formato=arrow ou
+# Accept: application/vnd.apache.arrow.stream.
+#
+# Uso:
+#   uvicorn api:app --host 0.0.0.0 --port 8000
+#   curl 'localhost:8000/2024/Maconha/ranking?n=5'
+#   curl 'localhost:8000/2024/Crack/selecao?municipio=CURITIBA&mes=Jan&mes=Fev&formato=arrow' > sel.arrow
+#   curl localhost:8000/metrics                      # tempos por rota (Prometheus)
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+import serie
+from cubo import montar_motor
+from dados import ANO_PADRAO, carregar
+from diagnostico import Metricas, configurar_log
+from registro import Registro
+from vigia import Vigia, fontes_vigiadas, recarregar_fonte
+
+MIDIA_ARROW = "application/vnd.apache.arrow.stream"
+CASAS_JSON = 3  # kg com precisão de grama
+
+
+# ------------------------------
+# Dados (um cubo por ano, compartilhado entre requisições e trocado pelo vigia na recarga)
+# ------------------------------
+planilhas = Registro()
+motores = Registro(medir_copia=False)
+
+
+def anos_disponiveis():
+    return (serie.anos_disponiveis() if serie.pa is not None else []) or [ANO_PADRAO]
+
+
+def carregar_planilha(path):
+    return planilhas.obter(("planilha", path), lambda: carregar(path))
+
+
+def cubo_do_ano(ano):
+    return motores.obter(("motor", ano), lambda: montar_motor(ano, carregar=carregar_planilha))
+
+
+def obter_cubo(ano, droga=None):
+    if ano not in anos_disponiveis():
+        raise HTTPException(404, f"Ano sem dados: {ano}")
+    cubo = cubo_do_ano(ano)
+    if droga is not None and droga not in cubo.drogas:
+        raise HTTPException(404, f"Droga sem dados em {ano}: {droga}")
+    return cubo
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    if serie.pa is not None:
+        try:
+            await run_in_threadpool(serie.importar_planilhas, ANO_PADRAO)
+        except OSError:
+            pass  # sem permissão de escrita: fica só com as planilhas
+    # mesma recarga a quente do dashboard: CSV ou lote novo troca só o motor do ano afetado
+    vigia = Vigia(fontes_vigiadas, lambda nome, path: recarregar_fonte(
+        nome, path, planilhas, motores, met=metricas)).iniciar()
+    yield
+    vigia.parar()
+
+
+app = FastAPI(title="Apreensões de Drogas no Paraná", lifespan=ciclo_de_vida)
+configurar_log()
+metricas = Metricas()
+
+
+@app.middleware("http")
+async def cronometrar(request, call_next):
+    inicio = time.perf_counter()
+    resposta = await call_next(request)
+    # rótulo pela rota (/{ano}/{droga}/ranking), não pela URL: cardinalidade fixa
+    rota = getattr(request.scope.get("route"), "path", "desconhecida")
+    metricas.registrar(rota, time.perf_counter() - inicio, status=resposta.status_code)
+    metricas.contar("requisicoes_total", rota=rota, status=resposta.status_code)
+    tamanho = resposta.headers.get("content-length")
+    if tamanho is not None:
+        metricas.definir("resposta_bytes", int(tamanho), rota=rota)
+    return resposta
+
+
+# ------------------------------
+# Respostas
+# ------------------------------
+def responder(df, request, formato):
+    """DataFrame em JSON (lista de registros) ou Arrow IPC, conforme pedido."""
+    if formato == "arrow" or MIDIA_ARROW in request.headers.get("accept", ""):
+        import pyarrow as pa
+
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+        return Response(sink.getvalue().to_pybytes(), media_type=MIDIA_ARROW)
+    return JSONResponse(df.round(CASAS_JSON).to_dict(orient="records"))
+
+
+def _lista(valores):
+    # sem o parâmetro na URL = todos
+    return valores or None
+
+
+def _meses(cubo, mes):
+    invalidos = [m for m in mes or [] if m not in cubo.meses]
+    if invalidos:
+        raise HTTPException(422, f"Mês inválido: {', '.join(invalidos)} (use {', '.join(cubo.meses)})")
+    return _lista(mes)
+
+
+# ------------------------------
+# Rotas
+# ------------------------------
+# Rotas de consulta em `def`: o FastAPI as roda no pool de threads, então a montagem do
+# motor e as consultas (SQL no DuckDB inclusive) não travam o event loop das outras requisições.
+@app.get("/anos")
+def anos():
+    return {"anos": anos_disponiveis()}
+
+
+@app.get("/{ano}/drogas")
+def drogas(ano: int):
+    cubo = obter_cubo(ano)
+    return {"drogas": cubo.drogas, "meses": cubo.meses, "municipios": sorted(cubo.municipios.tolist())}
+
+
+@app.get("/{ano}/{droga}/tabela")
+def tabela(request: Request, ano: int, droga: str,
+                 municipio: Optional[List[str]] = Query(None), mes: Optional[List[str]] = Query(None),
+                 formato: str = "json"):
+    cubo = obter_cubo(ano, droga)
+    return responder(cubo.tabela(droga, _lista(municipio), _meses(cubo, mes)), request, formato)
+
+
+@app.get("/{ano}/{droga}/selecao")
+def selecao(request: Request, ano: int, droga: str,
+                  municipio: Optional[List[str]] = Query(None), mes: Optional[List[str]] = Query(None),
+                  formato: str = "json"):
+    cubo = obter_cubo(ano, droga)
+    return responder(cubo.selecao(droga, _lista(municipio), _meses(cubo, mes)), request, formato)
+
+
+@app.get("/{ano}/{droga}/evolucao")
+def evolucao(request: Request, ano: int, droga: str,
+                   municipio: Optional[List[str]] = Query(None), mes: Optional[List[str]] = Query(None),
+                   formato: str = "json"):
+    cubo = obter_cubo(ano, droga)
+    return responder(cubo.longo(droga, _lista(municipio), _meses(cubo, mes)), request, formato)
+
+
+@app.get("/{ano}/{droga}/ranking")
+def ranking(request: Request, ano: int, droga: str, n: int = Query(10, ge=1),
+                  mes: Optional[List[str]] = Query(None), por_habitantes: bool = False,
+                  formato: str = "json"):
+    cubo = obter_cubo(ano, droga)
+    if por_habitantes and cubo.populacao is None:
+        raise HTTPException(422, "Ranking por habitantes indisponível: dimensão de municípios sem população")
+    nomes, totais = cubo.ranking(droga, n, _meses(cubo, mes), por_habitantes)
+    return responder(pd.DataFrame({"Municipio": nomes, "Total": totais}), request, formato)
+
+
+@app.get("/{ano}/{droga}/estadual")
+def estadual(request: Request, ano: int, droga: str,
+                   mes: Optional[List[str]] = Query(None), formato: str = "json"):
+    cubo = obter_cubo(ano, droga)
+    meses = _meses(cubo, mes)
+    df = pd.DataFrame({"Mes": cubo.nomes_meses(meses), "Total": cubo.estadual_por_mes(droga, meses)})
+    return responder(df, request, formato)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(metricas.prometheus(), media_type="text/plain; version=0.0.4")
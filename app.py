@@ -1,227 +1,430 @@
 # app_drogas.py
+import functools
+
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-import requests
-from unidecode import unidecode
 
-st.set_page_config(page_title="Apreensão de Drogas no Paraná - 2024", layout="wide")
+import exportacao
+import figuras
+import geo
+import serie
+from cubo import montar_motor
+from dados import ANO_PADRAO, DATA_FILES, DEFAULT_MUNICIPIOS, carregar
+from diagnostico import Metricas, configurar_log
+from figuras import CacheFiguras, chave_filtros
+from formatacao import formatar_tabela
+from registro import Registro
+from vigia import Vigia, fontes_vigiadas, recarregar_fonte
 
-st.title("🚔 Apreensões de Drogas no Paraná - 2024")
+st.set_page_config(page_title="Apreensão de Drogas no Paraná", layout="wide")
 
 # ------------------------------
 # Constantes
 # ------------------------------
-DATA_FILES = {
-    "Maconha": "MaconhaV2.csv",
-    "Cocaína": "CocainaV2.csv",
-    "Crack": "CrackV2.csv",
+CASAS_TABELA = 3  # kg com precisão de grama
+# muitos municípios: o automático troca ~400 linhas rotuladas por top-K + "Outros"
+MODOS_EVOLUCAO = {
+    "Automático": "auto",
+    f"Top {figuras.TOP_LINHAS} + outros": "top",
+    "Todas as linhas (WebGL)": "webgl",
+    "Todas as linhas": "linhas",
 }
-DEFAULT_MUNICIPIOS = ["CURITIBA", "FOZ DO IGUACU", "LONDRINA"]
+# somas móveis oferecidas por granularidade (unidade, tamanhos)
+JANELAS_EVOLUCAO = {"dia": ("dias", (7, 30)), "semana": ("semanas", (4, 13)), "mes": ("meses", (3, 6))}
 
 # ------------------------------
 # Função para carregar dados
 # ------------------------------
-@st.cache_data
+@st.cache_resource
+def registro_dados():
+    # planilhas e malhas imutáveis, uma vez por processo, entregues por referência (sem pickle por chamada)
+    return Registro()
+
 def carregar_dados(path):
     try:
-        df = pd.read_csv(path)
-        df.dropna(subset=["Municipio"], inplace=True)
-        return df
+        # usa o cache colunar em cache/ quando existe e está em dia com o CSV
+        return registro_dados().obter(("planilha", path), lambda: carregar(path))
     except FileNotFoundError:
         st.error(f"Arquivo de dados não encontrado: {path}")
         return pd.DataFrame()
 
-# ------------------------------
-# Carregar planilhas
-# ------------------------------
-dados = {droga: carregar_dados(arquivo) for droga, arquivo in DATA_FILES.items()}
+@st.cache_resource
+def metricas():
+    # tempos por seção e contadores do processo (painel de diagnóstico, log JSON, Prometheus)
+    configurar_log()
+    return Metricas()
 
-# ------------------------------
-# Sidebar - seleção de droga, município e mês
-# ------------------------------
-st.sidebar.header("Filtros")
+def cronometrado(secao):
+    # mede a seção inteira, inclusive quando só o fragmento roda de novo
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def medir(*args, **kwargs):
+            with metricas().medir(secao):
+                return funcao(*args, **kwargs)
+        return medir
+    return decorar
 
-droga = st.sidebar.selectbox("Selecione a droga", list(dados.keys()))
-df = dados[droga]
+@st.cache_resource
+def cache_figuras():
+    # JSON das figuras por filtro normalizado, compartilhado entre todas as sessões do processo
+    return CacheFiguras(metricas=metricas())
 
-if df.empty:
-    st.warning(f"Não foi possível carregar os dados para a droga '{droga}'. Verifique o arquivo de dados.")
-    st.stop()
+@st.cache_resource
+def preparar_serie():
+    # garante o ano padrão na série histórica a partir das planilhas V2 (só o que falta/mudou)
+    if serie.pa is None:
+        return []
+    try:
+        serie.importar_planilhas(ANO_PADRAO)
+    except OSError:
+        return []  # sem permissão de escrita: fica só com as planilhas
+    return serie.anos_disponiveis()
 
-# filtro municípios
-municipios_options = sorted(df["Municipio"].unique())
-st.sidebar.subheader("Municípios")
-select_all_mun = st.sidebar.checkbox("Selecionar todos os municípios")
-if select_all_mun:
-    municipios = st.sidebar.multiselect("Selecione municípios", options=municipios_options, default=municipios_options)
-else:
-    municipios = st.sidebar.multiselect("Selecione municípios", options=municipios_options, default=DEFAULT_MUNICIPIOS)
+@st.cache_resource
+def registro_motores():
+    # motor de consulta por ano, trocado de uma vez quando o vigia recarrega uma planilha
+    return Registro(medir_copia=False)
 
-# filtro meses
-colunas_mensais = [c for c in df.columns if c not in ("Municipio", "Total")]
-st.sidebar.subheader("Meses")
-select_all_meses = st.sidebar.checkbox("Selecionar todos os meses", value=True)
-if select_all_meses:
-    meses_selecionados = st.sidebar.multiselect("Selecione meses", options=colunas_mensais, default=colunas_mensais)
-else:
-    meses_selecionados = st.sidebar.multiselect("Selecione meses", options=colunas_mensais, default=[])
+def carregar_cubo(ano):
+    # cubo droga × município × mês do ano, montado uma vez por processo e compartilhado entre sessões;
+    # com geo/dim_municipios.csv já sai com o código IBGE de cada município, sem ele só com os nomes
+    vigia_planilhas()
+    def montar():
+        preparar_serie()
+        return montar_motor(ano, carregar=carregar_dados)
+    return registro_motores().obter(("motor", ano), montar)
+
+@st.cache_resource
+def vigia_planilhas():
+    # um vigia por processo sobre os CSVs V2 e a base diária (polling de mtime); recarrega só a droga trocada
+    ao_mudar = functools.partial(recarregar_fonte, planilhas=registro_dados(), motores=registro_motores(),
+                                 figs=cache_figuras(), met=metricas())
+    return Vigia(fontes_vigiadas, ao_mudar).iniciar()
+
+# ------------------------------
+# Malhas do mapa
+# ------------------------------
+def carregar_geojson_municipios_pr():
+    # GeoJSON simplificado dos municípios do PR (UF 41), já com name_ascii.
+    # Gerado por `python geo.py` no build; sem o artefato, geo.ArtefatoAusente (nada de rede aqui).
+    def carregar_malha():
+        with metricas().medir("geo.municipios"):
+            return geo.carregar_municipios()
+    return registro_dados().obter(("geo", "municipios"), carregar_malha)
 
-# aplica filtros
-df_filtrado = df[df["Municipio"].isin(municipios)].copy()
-df_filtrado["TotalSelecionado"] = df_filtrado[meses_selecionados].sum(axis=1) if meses_selecionados else 0
+def url_geojson_municipios_pr():
+    # Mapa WebGL: a malha é servida como arquivo estático (static/, server.enableStaticServing).
+    # None se a cópia não foi feita no build e static/ não aceita escrita (o mapa cai para SVG)
+    try:
+        return geo.publicar_municipios()
+    except geo.ArtefatoAusente:
+        raise
+    except OSError:
+        return None
 
-# tabela
-colunas_tabela = ["Municipio"] + meses_selecionados + (["Total"] if "Total" in df.columns else [])
-df_tabela = df_filtrado[colunas_tabela]
+def carregar_geojson_contorno_pr():
+    # Perímetro do estado do PR já como polilinha única (lon/lat, NaN entre os anéis)
+    def carregar_linhas():
+        with metricas().medir("geo.contorno"):
+            return geo.carregar_contorno_linhas()
+    return registro_dados().obter(("geo", "contorno"), carregar_linhas)
 
 # ------------------------------
 # VISUALIZAÇÃO TABELA (com separador de milhar)
 # ------------------------------
-st.subheader(f"📋 Tabela filtrada - {droga}")
-df_tabela_formatado = df_tabela.copy()
-for col in df_tabela_formatado.columns:
-    if pd.api.types.is_numeric_dtype(df_tabela_formatado[col]):
-        df_tabela_formatado[col] = df_tabela_formatado[col].map(lambda x: f"{int(x):,}".replace(",", "."))
-st.dataframe(df_tabela_formatado, use_container_width=True)
+@st.fragment
+@cronometrado("tabela")
+def secao_tabela(sel):
+    st.subheader(f"📋 Tabela filtrada - {sel.droga}")
+    st.dataframe(formatar_tabela(sel.tabela, casas=CASAS_TABELA), use_container_width=True)
 
 # ------------------------------
 # RANKING
 # ------------------------------
-st.subheader(f"🏆 Maiores apreensões de {droga} (Total anual)")
-ranking = df.sort_values("Total", ascending=False).head(10)
-fig_rank = px.bar(ranking, x="Municipio", y="Total", title=f"Top 10 Municípios - {droga} (Total Anual)", text="Total")
-fig_rank.update_traces(texttemplate='%{text:,.0f}'.replace(",", "."), textposition="outside")
-st.plotly_chart(fig_rank, use_container_width=True)
+@st.fragment
+@cronometrado("ranking")
+def secao_ranking(ano, droga, meses):
+    cubo = carregar_cubo(ano)
+    anual = len(meses) == len(cubo.meses)
+    st.subheader(f"🏆 Maiores apreensões de {droga} ({'Total anual' if anual else 'meses selecionados'})")
+    col_n, col_pop = st.columns(2)
+    n = col_n.slider("Quantidade de municípios", 5, 50, 10, step=5)
+    por_habitantes = col_pop.toggle(
+        "Por 100 mil habitantes", disabled=cubo.populacao is None,
+        help=None if cubo.populacao is not None else
+        f"Sem população completa na dimensão (gere {geo.ARQ_POPULACAO.name}, ver geo.py)",
+    )
+    fig_rank = cache_figuras().obter(
+        chave_filtros(cubo, "ranking", droga, meses=meses) + (n, por_habitantes),
+        lambda: figuras.figura_ranking(cubo, droga, n, meses, por_habitantes),
+    )
+    st.plotly_chart(fig_rank, use_container_width=True)
 
 # ------------------------------
 # EVOLUÇÃO MENSAL
 # ------------------------------
-st.subheader(f"📈 Evolução mensal por município - {droga}")
-df_melt = df_filtrado.melt(id_vars=["Municipio"], value_vars=meses_selecionados, var_name="Mes", value_name="Kg")
-fig_line = px.line(df_melt, x="Mes", y="Kg", color="Municipio", markers=True, title=f"Evolução das apreensões mensais - {droga}", text="Kg")
-fig_line.update_traces(texttemplate='%{text:,.0f}'.replace(",", "."), textposition="top center")
-st.plotly_chart(fig_line, use_container_width=True)
+@st.fragment
+@cronometrado("evolucao")
+def secao_evolucao(sel):
+    st.subheader(f"📈 Evolução por município - {sel.droga}")
+    # dia/semana só existem para drogas com ocorrências na base diária
+    granularidades = {"Mês": "mes"}
+    if sel.motor.diario is not None and sel.droga in sel.motor.diario.drogas:
+        granularidades.update({"Semana": "semana", "Dia": "dia"})
+    col_modo, col_gran, col_janela = st.columns(3)
+    modo = MODOS_EVOLUCAO[col_modo.selectbox("Exibição", list(MODOS_EVOLUCAO))]
+    granularidade = granularidades[col_gran.selectbox("Granularidade", list(granularidades))]
+    # a janela conta pontos da granularidade escolhida (dias, semanas ou meses)
+    unidade, opcoes = JANELAS_EVOLUCAO[granularidade]
+    janelas = {"Sem soma móvel": None, **{f"Soma móvel {k} {unidade}": k for k in opcoes}}
+    janela = janelas[col_janela.selectbox("Janela", list(janelas))]
+    fig_line = cache_figuras().obter(
+        sel.chave("evolucao") + (modo, granularidade, janela),
+        lambda: figuras.figura_evolucao(sel.motor, sel.droga, sel.municipios, sel.meses, modo,
+                                        granularidade, janela),
+    )
+    st.plotly_chart(fig_line, use_container_width=True)
+    if granularidade != "mes":
+        st.caption("Dia e semana cobrem só as ocorrências ingeridas (trat.py --ocorrencias), "
+                   "sem os totais mensais das planilhas.")
 
 # ------------------------------
 # TOTAL ESTADUAL POR MÊS
 # ------------------------------
-st.subheader(f"📊 Total estadual por mês - {droga}")
-df_total_mes = df[meses_selecionados].sum()
-fig_state = px.bar(
-    x=df_total_mes.index, 
-    y=df_total_mes.values, 
-    labels={"x": "Mês", "y": "Total (kg)"}, 
-    title=f"Total estadual por mês - {droga}", 
-    text=df_total_mes.values
-)
-fig_state.update_traces(texttemplate='%{text:,.0f}'.replace(",", "."), textposition="outside")
-st.plotly_chart(fig_state, use_container_width=True)
+@st.fragment
+@cronometrado("estadual")
+def secao_estadual(ano, droga, meses):
+    st.subheader(f"📊 Total estadual por mês - {droga}")
+    cubo = carregar_cubo(ano)
+    fig_state = cache_figuras().obter(
+        chave_filtros(cubo, "estadual", droga, meses=meses),
+        lambda: figuras.figura_estadual(cubo, droga, meses),
+    )
+    st.plotly_chart(fig_state, use_container_width=True)
 
 # ------------------------------
 # PARTICIPAÇÃO POR MUNICÍPIO
 # ------------------------------
-st.subheader(f"🍕 Participação por município - {droga} (meses selecionados)")
-df_pizza = df_filtrado[df_filtrado["TotalSelecionado"] > 0]
-fig_pizza = px.pie(
-    df_pizza, 
-    names="Municipio", 
-    values="TotalSelecionado", 
-    title=f"Distribuição das apreensões por município - {droga}", 
-    hole=0.3
-)
-fig_pizza.update_traces(textinfo="label+percent+value", texttemplate='%{value:,.0f}'.replace(",", "."))
-st.plotly_chart(fig_pizza, use_container_width=True)
+@st.fragment
+@cronometrado("pizza")
+def secao_pizza(sel):
+    st.subheader(f"🍕 Participação por município - {sel.droga} (meses selecionados)")
+    fig_pizza = cache_figuras().obter(
+        sel.chave("pizza"),
+        lambda: figuras.figura_pizza(sel.selecao, sel.droga),
+    )
+    st.plotly_chart(fig_pizza, use_container_width=True)
 
 # ------------------------------
 # EXPORTAR
 # ------------------------------
-st.subheader("💾 Exportar dados")
-csv = df_tabela.to_csv(index=False).encode("utf-8")
-st.download_button(f"Baixar CSV filtrado ({droga})", csv, f"apreensao_{droga.lower()}_filtrada.csv", "text/csv")
+@st.fragment
+@cronometrado("exportar")
+def secao_exportar(ano, droga, municipios, meses):
+    st.subheader("💾 Exportar dados")
+    col_formato, col_drogas = st.columns(2)
+    formato = col_formato.selectbox("Formato", exportacao.formatos_disponiveis())
+    # modo comparativo (droga=None): sempre todas as drogas
+    todas = droga is None or col_drogas.checkbox("Todas as drogas num arquivo só")
+
+    cubo = carregar_cubo(ano)
+    drogas = tuple(cubo.drogas) if todas else (droga,)
+    rotulo = "todas as drogas" if todas else droga
+    # o arquivo só é gerado no clique (e fica em cache pela seleção)
+    st.download_button(
+        f"Baixar {formato} filtrado ({rotulo})",
+        lambda: exportacao.exportar(cubo, drogas, municipios, meses, formato),
+        exportacao.nome_arquivo(drogas, formato),
+        exportacao.FORMATOS[formato][1],
+    )
+
+# ------------------------------
 # 🗺️ MAPA: Apreensões por município (meses selecionados) + contorno do PR
 # ------------------------------
+@st.fragment
+@cronometrado("mapa")
+def secao_mapa(sel):
+    st.subheader(f"🗺️ Mapa de apreensões por município - {sel.droga}")
 
-st.subheader(f"🗺️ Mapa de apreensões por município - {droga}")
+    # --- Controle de tamanho fica dentro do fragmento: mexer nele só redesenha o mapa
+    tamanho_mapa = st.select_slider(
+        "Tamanho do mapa",
+        options=["Pequeno", "Médio", "Grande", "Tela cheia"],
+        value="Grande"
+    )
+    alturas = {"Pequeno": 450, "Médio": 600, "Grande": 800, "Tela cheia": 950}
+    # WebGL (MapLibre): malha baixada uma vez pelo navegador; cada filtro só manda os totais
+    webgl = st.radio("Renderização", ["SVG", "WebGL"], horizontal=True) == "WebGL"
 
-@st.cache_data
-def carregar_geojson_municipios_pr():
-    # GeoJSON dos municípios do PR (UF 41)
-    url = "https://raw.githubusercontent.com/tbrugz/geodata-br/master/geojson/geojs-41-mun.json"
-    gj = requests.get(url, timeout=30).json()
-    # Normaliza nomes para casar com o CSV
-    for f in gj["features"]:
-        f["properties"]["name_ascii"] = unidecode(f["properties"]["name"]).upper()
-    return gj
-
-@st.cache_data
-def carregar_geojson_contorno_pr():
-    # GeoJSON do perímetro do estado do PR (uma feature)
-    url = "https://raw.githubusercontent.com/giuliano-macedo/geodata-br-states/main/geojson/br_states/br_pr.json"
-    return requests.get(url, timeout=30).json()
-
-def adicionar_contorno_uf(fig, uf_geojson, cor="black", largura=2.5):
-    """Desenha o contorno da UF por cima do mapa (Polygon/MultiPolygon)."""
-    geom = uf_geojson["features"][0]["geometry"]
-    coords = geom["coordinates"]
-    multipoligonos = coords if geom["type"] == "MultiPolygon" else [coords]
-
-    for poligono in multipoligonos:   # poligono = [anel_externo, aneis_internos...]
-        for anel in poligono:         # anel = lista de [lon, lat]
-            lons, lats = zip(*anel)
-            fig.add_trace(go.Scattergeo(
-                lon=lons, lat=lats,
-                mode="lines",
-                line=dict(color=cor, width=largura),
-                hoverinfo="skip",
-                showlegend=False
-            ))
-    return fig
-
-# --- Dados e pré-processamento
-geojson_mun = carregar_geojson_municipios_pr()
-geojson_uf = carregar_geojson_contorno_pr()
-
-df_mapa = df_filtrado.copy()
-df_mapa["TotalSelecionado"] = df_mapa[meses_selecionados].sum(axis=1)
-df_mapa["Municipio_ascii"] = df_mapa["Municipio"].map(lambda s: unidecode(str(s)).upper())
-
-# Remove municípios com zero (opcional: deixa o mapa mais limpo)
-df_mapa = df_mapa[df_mapa["TotalSelecionado"] > 0]
-
-# --- Controle de tamanho pela sidebar
-tamanho_mapa = st.sidebar.select_slider(
-    "Tamanho do mapa",
-    options=["Pequeno", "Médio", "Grande", "Tela cheia"],
-    value="Grande"
-)
-alturas = {"Pequeno": 450, "Médio": 600, "Grande": 800, "Tela cheia": 950}
-
-if df_mapa.empty:
-    st.info("Sem dados para os filtros atuais (municípios/meses). Ajuste os filtros para visualizar o mapa.")
-else:
-    # --- Choropleth por município
-    fig_map = px.choropleth(
-        df_mapa,
-        geojson=geojson_mun,
-        locations="Municipio_ascii",
-        featureidkey="properties.name_ascii",
-        color="TotalSelecionado",
-        color_continuous_scale="Plasma",  # Aqui você muda a escala de cores
-        projection="mercator",
-        labels={"TotalSelecionado": "Kg"},
-        title=f"Mapa de apreensões – {droga} (meses selecionados)"
+    try:
+        contorno = carregar_geojson_contorno_pr()
+        malha = url_geojson_municipios_pr() if webgl else None
+        if malha is None:
+            if webgl:
+                st.caption(f"Sem a cópia estática da malha ({geo.ARQ_MUNICIPIOS_ESTATICO}): mapa em SVG.")
+            webgl = False
+            malha = carregar_geojson_municipios_pr()
+    except geo.ArtefatoAusente as e:
+        st.error(str(e))
+        return
+
+    df_mapa, sem_malha = sel.mapa
+    if sem_malha:
+        st.caption(f"Sem correspondência na malha do IBGE (fora do mapa): {', '.join(sem_malha)}")
+    if df_mapa.empty:
+        st.info("Sem dados para os filtros atuais (municípios/meses). Ajuste os filtros para visualizar o mapa.")
+        return
+
+    # --- A altura não entra na chave: mudar o tamanho reaproveita a figura em cache
+    if webgl:
+        fig_map = cache_figuras().obter(
+            sel.chave("mapa_webgl"),
+            lambda: figuras.figura_mapa_webgl(df_mapa, malha, contorno, sel.droga),
+        )
+    else:
+        fig_map = cache_figuras().obter(
+            sel.chave("mapa"),
+            lambda: figuras.figura_mapa(df_mapa, malha, contorno, sel.droga),
+        )
+    fig_map.update_layout(height=alturas[tamanho_mapa])
+    st.plotly_chart(fig_map, use_container_width=True)
+
+# ------------------------------
+# 🔀 COMPARAÇÃO ENTRE DROGAS (um recorte do cubo alinhado droga × município × mês)
+# ------------------------------
+@st.fragment
+@cronometrado("comparativo_tabela")
+def secao_comparativo_tabela(ano, municipios, meses, df_comp):
+    st.subheader("📋 Total por município e droga (meses selecionados)")
+    cubo = carregar_cubo(ano)
+    df_tabela = df_comp.pivot_table(index="Municipio", columns="Droga", values="Kg", aggfunc="sum",
+                                    observed=True, sort=False).reindex(columns=cubo.drogas)
+    df_tabela["Total"] = df_tabela.sum(axis=1)
+    df_tabela.columns.name = None
+    st.dataframe(formatar_tabela(df_tabela.reset_index(), casas=CASAS_TABELA), use_container_width=True)
+
+@st.fragment
+@cronometrado("comparativo_mensal")
+def secao_comparativo_mensal(ano, municipios, meses, df_comp):
+    st.subheader("📊 Apreensões por mês, empilhadas por droga")
+    cubo = carregar_cubo(ano)
+    fig = cache_figuras().obter(
+        chave_filtros(cubo, "comparativo_mensal", None, municipios, meses),
+        lambda: figuras.figura_comparativo_mensal(df_comp, cubo.drogas, cubo.nomes_meses(meses)),
     )
+    st.plotly_chart(fig, use_container_width=True)
 
-    # --- Contorno da UF
-    fig_map = adicionar_contorno_uf(fig_map, geojson_uf, cor="black", largura=2.5)
+@st.fragment
+@cronometrado("comparativo_evolucao")
+def secao_comparativo_evolucao(ano, municipios, meses, df_comp):
+    st.subheader("📈 Evolução mensal por município, um painel por droga")
+    modo = MODOS_EVOLUCAO[st.selectbox("Exibição", list(MODOS_EVOLUCAO), key="modo_comparativo")]
+    cubo = carregar_cubo(ano)
+    fig = cache_figuras().obter(
+        chave_filtros(cubo, "comparativo_evolucao", None, municipios, meses) + (modo,),
+        lambda: figuras.figura_comparativo_evolucao(df_comp, cubo.drogas, cubo.nomes_meses(meses), modo),
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
-    # --- Enquadramento e layout (área maior + margens pequenas)
-    fig_map.update_geos(fitbounds="locations", visible=False)
-    fig_map.update_layout(
-        height=alturas[tamanho_mapa],
-        margin=dict(l=0, r=0, t=60, b=0)
+@st.fragment
+@cronometrado("ranking_combinado")
+def secao_ranking_combinado(ano, meses):
+    st.subheader("🏆 Maiores apreensões somando as drogas")
+    cubo = carregar_cubo(ano)
+    n = st.slider("Quantidade de municípios", 5, 50, 10, step=5, key="n_combinado")
+    fig = cache_figuras().obter(
+        chave_filtros(cubo, "ranking_combinado", None, meses=meses) + (n,),
+        lambda: figuras.figura_ranking_combinado(cubo, n, meses),
     )
+    st.plotly_chart(fig, use_container_width=True)
+
+# ------------------------------
+# Sidebar - seleção de ano, droga, município e mês
+# ------------------------------
+st.sidebar.header("Filtros")
+
+# relido a cada rerun: um ano novo vindo das ocorrências aparece sem reiniciar o processo
+anos = (serie.anos_disponiveis() if preparar_serie() else []) or [ANO_PADRAO]
+ano = st.sidebar.selectbox("Ano", anos)
+with metricas().medir("carga"):
+    cubo = carregar_cubo(ano)
+
+st.title(f"🚔 Apreensões de Drogas no Paraná - {ano}")
+
+if not cubo.drogas:
+    st.warning(f"Não foi possível carregar os dados de {ano}. Verifique os arquivos de dados.")
+    st.stop()
+
+comparar = st.sidebar.radio("Modo", ["Uma droga", "Comparar drogas"], horizontal=True) == "Comparar drogas"
+droga = None if comparar else st.sidebar.selectbox("Selecione a droga", cubo.drogas)
+
+# filtro municípios
+municipios_options = sorted(cubo.municipios)
+st.sidebar.subheader("Municípios")
+select_all_mun = st.sidebar.checkbox("Selecionar todos os municípios")
+if select_all_mun:
+    municipios = st.sidebar.multiselect("Selecione municípios", options=municipios_options, default=municipios_options)
+else:
+    default_mun = [m for m in DEFAULT_MUNICIPIOS if m in municipios_options]
+    municipios = st.sidebar.multiselect("Selecione municípios", options=municipios_options, default=default_mun)
+
+# filtro meses
+colunas_mensais = cubo.meses
+st.sidebar.subheader("Meses")
+select_all_meses = st.sidebar.checkbox("Selecionar todos os meses", value=True)
+if select_all_meses:
+    meses_selecionados = st.sidebar.multiselect("Selecione meses", options=colunas_mensais, default=colunas_mensais)
+else:
+    meses_selecionados = st.sidebar.multiselect("Selecione meses", options=colunas_mensais, default=[])
+
+filtros = (ano, droga, tuple(municipios), tuple(meses_selecionados))
+
+# ------------------------------
+# Seções
+# ------------------------------
+if comparar:
+    # todas as drogas numa passada: um recorte do cubo, lido por todas as seções
+    df_comp = cubo.comparativo(municipios, meses_selecionados)
+    secao_comparativo_tabela(ano, *filtros[2:], df_comp)
+    secao_comparativo_mensal(ano, *filtros[2:], df_comp)
+    secao_comparativo_evolucao(ano, *filtros[2:], df_comp)
+    secao_ranking_combinado(ano, tuple(meses_selecionados))
+    secao_exportar(*filtros)
+else:
+    # contexto da rerun: índices da seleção + derivados calculados uma vez e lidos por todas as seções
+    sel = cubo.selecionar(droga, municipios, meses_selecionados)
+    secao_tabela(sel)
+    secao_ranking(ano, droga, tuple(meses_selecionados))
+    secao_evolucao(sel)
+    secao_estadual(ano, droga, tuple(meses_selecionados))
+    secao_pizza(sel)
+    secao_exportar(*filtros)
+    secao_mapa(sel)
 
-    st.plotly_chart(fig_map, use_container_width=True)
\ No newline at end of file
+# ------------------------------
+# Diagnóstico (tempos por seção, caches e payloads do processo)
+# ------------------------------
+# Reflete a última execução completa; reruns só de fragmento aparecem na próxima.
+if st.sidebar.checkbox("Mostrar diagnóstico"):
+    with st.sidebar.expander("Diagnóstico", expanded=True):
+        m = metricas()
+        df_diag = pd.DataFrame(m.secoes())
+        if not df_diag.empty:
+            df_diag["acertos"] = [m.valor("figuras_cache_total", secao=s, resultado="acerto") for s in df_diag["secao"]]
+            df_diag["faltas"] = [m.valor("figuras_cache_total", secao=s, resultado="falta") for s in df_diag["secao"]]
+            df_diag["figura_kb"] = [m.valor("figura_bytes", secao=s) / 1024 for s in df_diag["secao"]]
+            st.dataframe(df_diag.round(1), hide_index=True, use_container_width=True)
+        est = cache_figuras().estatisticas()
+        st.caption(
+            f"Figuras: {est['acertos']} acertos · {est['faltas']} faltas ({est['taxa_acerto']:.0%}) · "
+            f"{est['itens']} figuras, {est['bytes'] / 1e6:.1f} MB"
+        )
+        est = registro_dados().estatisticas()
+        st.caption(
+            f"Dados por referência: {est['itens']} itens ({est['bytes'] / 1e6:.1f} MB), "
+            f"{est['acertos']} acertos · {est['copia_evitada_s'] * 1000:.0f} ms de cópia evitados"
+        )
+        recargas = sum(m.valor("recargas_total", droga=d) for d in DATA_FILES)
+        if recargas:
+            st.caption(f"Planilhas recarregadas a quente: {recargas}")
+        st.download_button("Métricas (Prometheus)", m.prometheus(), "metricas.prom", "text/plain")
@@ -0,0 +1,221 @@
+# bench.py
+# Benchmark do caminho de dados do dashboard, sem Streamlit.
+#
+# Mede tempo, pico de memória (tracemalloc) e bytes do JSON do Plotly de cada etapa
+# (carga, cubo, tabela, seleção, melt, mapa e figuras) na visão padrão e com todos os
+# municípios/meses, nos dados reais e em versões sintéticas 10× e 100× maiores.
+#
+# Uso:
+#   python bench.py                                  # grava bench_<commit>.json
+#   python bench.py --escalas 1 10 --repeticoes 3 --saida antes.json
+#   python bench.py --comparar antes.json depois.json
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import dados
+import figuras
+import geo
+from cubo import Cubo
+from dados import DATA_FILES, DEFAULT_MUNICIPIOS
+from formatacao import formatar_tabela
+
+
+# ------------------------------
+# Medição
+# ------------------------------
+def medir(fn, repeticoes):
+    """Roda `fn` e devolve (resultado, tempos em ms, pico de memória em MB)."""
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        resultado = fn()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, tempos, pico / 1e6
+
+
+def payload(resultado):
+    """Bytes do JSON que o Streamlit mandaria ao navegador (só para figuras)."""
+    if isinstance(resultado, go.Figure):
+        return len(resultado.to_json())
+    return None
+
+
+# ------------------------------
+# Dados sintéticos
+# ------------------------------
+def escalar_csvs(fator, destino, semente=0):
+    """Grava cópias dos CSVs com `fator` vezes mais municípios (nomes com sufixo #k)."""
+    rng = np.random.default_rng(semente)
+    arquivos = {}
+    for droga, arquivo in DATA_FILES.items():
+        df = dados.ler_csv(arquivo)
+        df["Municipio"] = df["Municipio"].astype(str)
+        partes = [df]
+        meses = dados.colunas_mensais(df)
+        for k in range(1, fator):
+            copia = df.copy()
+            copia["Municipio"] = copia["Municipio"] + f" #{k}"
+            copia[meses] = copia[meses] * rng.uniform(0.5, 1.5, size=(len(copia), len(meses)))
+            copia["Total"] = copia[meses].sum(axis=1)
+            partes.append(copia)
+        caminho = Path(destino) / Path(arquivo).name
+        pd.concat(partes, ignore_index=True).to_csv(caminho, index=False)
+        arquivos[droga] = str(caminho)
+    return arquivos
+
+
+# ------------------------------
+# Cenários
+# ------------------------------
+def rodar_escala(fator, repeticoes, malha, dimensao):
+    resultados = []
+
+    def registrar(cenario, etapa, fn):
+        resultado, tempos, pico = medir(fn, repeticoes)
+        resultados.append({
+            "escala": fator,
+            "cenario": cenario,
+            "etapa": etapa,
+            "tempo_ms_mediana": round(statistics.median(tempos), 3),
+            "tempo_ms_min": round(min(tempos), 3),
+            "pico_mb": round(pico, 3),
+            "payload_bytes": payload(resultado),
+        })
+        return resultado
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivos = DATA_FILES if fator == 1 else escalar_csvs(fator, tmp)
+
+        registrar("carga", "ler_csv", lambda: {d: dados.ler_csv(a) for d, a in arquivos.items()})
+        for arquivo in arquivos.values():
+            dados.compilar_cache(arquivo, Path(tmp) / (Path(arquivo).stem + ".arrow"))
+        registrar("carga", "ler_colunar", lambda: {
+            d: dados.ler_colunar(Path(tmp) / (Path(a).stem + ".arrow")) for d, a in arquivos.items()
+        })
+        planilhas = {d: dados.ler_csv(a) for d, a in arquivos.items()}
+        cubo = registrar("carga", "cubo", lambda: Cubo(planilhas, dimensao=dimensao))
+
+    droga = cubo.drogas[0]
+    for cenario, municipios in (("padrao", DEFAULT_MUNICIPIOS), ("todos", list(cubo.municipios))):
+        meses = cubo.meses
+
+        def tabela():
+            df_tabela = cubo.tabela(droga, municipios, meses)
+            return formatar_tabela(df_tabela, casas=3)
+
+        registrar(cenario, "tabela", tabela)
+        registrar(cenario, "selecao", lambda: cubo.selecao(droga, municipios, meses))
+        registrar(cenario, "melt", lambda: cubo.longo(droga, municipios, meses))
+        registrar(cenario, "mapa_dados", lambda: cubo.mapa(droga, municipios, meses))
+        registrar(cenario, "fig_ranking", lambda: figuras.figura_ranking(cubo, droga))
+        registrar(cenario, "fig_evolucao", lambda: figuras.figura_evolucao(cubo, droga, municipios, meses))
+        registrar(cenario, "fig_evolucao_webgl", lambda: figuras.figura_evolucao(cubo, droga, municipios, meses, "webgl"))
+        registrar(cenario, "fig_estadual", lambda: figuras.figura_estadual(cubo, droga, meses))
+        registrar(cenario, "fig_pizza", lambda: figuras.figura_pizza(cubo.selecao(droga, municipios, meses), droga))
+        if malha is not None:
+            geojson_mun, contorno = malha
+            df_mapa, _ = cubo.mapa(droga, municipios, meses)
+            registrar(cenario, "fig_mapa", lambda: figuras.figura_mapa(df_mapa, geojson_mun, contorno, droga))
+            url = f"{geo.URL_ESTATICO}/{geo.ARQ_MUNICIPIOS_ESTATICO.name}"
+            registrar(cenario, "fig_mapa_webgl", lambda: figuras.figura_mapa_webgl(df_mapa, url, contorno, droga))
+    return resultados
+
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def rodar(escalas, repeticoes):
+    malha = dimensao = None
+    if geo.ARQ_MUNICIPIOS.exists():
+        malha = (geo.carregar_municipios(), geo.carregar_contorno_linhas())
+        dimensao = geo.carregar_dimensao()
+    else:
+        print("Malha local ausente (rode `python geo.py`): etapa fig_mapa ignorada.", file=sys.stderr)
+
+    resultados = []
+    for fator in escalas:
+        print(f"escala {fator}×...", file=sys.stderr)
+        resultados.extend(rodar_escala(fator, repeticoes, malha, dimensao))
+    return {
+        "commit": commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "repeticoes": repeticoes,
+        "resultados": resultados,
+    }
+
+
+# ------------------------------
+# Relatório
+# ------------------------------
+def _chave(r):
+    return (r["escala"], r["cenario"], r["etapa"])
+
+
+def imprimir(relatorio):
+    print(f"{'escala':>6} {'cenário':<8} {'etapa':<14} {'ms (med)':>10} {'pico MB':>9} {'payload':>10}")
+    for r in relatorio["resultados"]:
+        carga = "" if r["payload_bytes"] is None else f"{r['payload_bytes']:,}"
+        print(f"{r['escala']:>6} {r['cenario']:<8} {r['etapa']:<14} "
+              f"{r['tempo_ms_mediana']:>10.2f} {r['pico_mb']:>9.2f} {carga:>10}")
+
+
+def comparar(antes, depois):
+    base = {_chave(r): r for r in antes["resultados"]}
+    print(f"{antes['commit']} -> {depois['commit']}")
+    print(f"{'escala':>6} {'cenário':<8} {'etapa':<14} {'ms antes':>10} {'ms depois':>10} {'razão':>7}")
+    for r in depois["resultados"]:
+        a = base.get(_chave(r))
+        if a is None:
+            continue
+        razao = r["tempo_ms_mediana"] / a["tempo_ms_mediana"] if a["tempo_ms_mediana"] else float("nan")
+        print(f"{r['escala']:>6} {r['cenario']:<8} {r['etapa']:<14} "
+              f"{a['tempo_ms_mediana']:>10.2f} {r['tempo_ms_mediana']:>10.2f} {razao:>6.2f}×")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do caminho de dados do dashboard.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100], help="fatores de escala dos dados")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: bench_<commit>.json)")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"), help="compara dois resultados salvos")
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        antes, depois = (json.loads(Path(p).read_text(encoding="utf-8")) for p in args.comparar)
+        comparar(antes, depois)
+        return 0
+
+    relatorio = rodar(args.escalas, args.repeticoes)
+    imprimir(relatorio)
+    saida = Path(args.saida or f"bench_{relatorio['commit']}.json")
+    saida.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"resultados em {saida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
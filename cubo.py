@@ -0,0 +1,539 @@
+# cubo.py
+# Cubo pré-agregado droga × município × mês com somas prefixadas nos meses.
+#
+# Montado uma vez a partir das planilhas carregadas; todos os gráficos do app
+# consultam o cubo em vez de refazer sort/sum/melt no pandas a cada rerun.
+#
+# Os arrays do cubo são compilados em cache/cubo/<ano>-<impressão>/*.npy e abertos com
+# mmap somente leitura: vários processos do Streamlit atrás do proxy dividem as mesmas
+# páginas do page cache, sem cópia nem desserialização por worker.
+import hashlib
+import json
+import os
+import shutil
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import dados
+import geo
+import serie
+from dados import ANO_PADRAO, DATA_FILES, MESES, colunas_mensais
+from geo import chave_ascii
+
+# "cubo" (numpy em memória) ou "duckdb" (SQL sobre a série, ver motor_duckdb.py)
+MOTOR_CONSULTA = os.environ.get("MOTOR_CONSULTA", "cubo")
+CUBO_DIR = Path(dados.CACHE_DIR) / "cubo"
+ARRAYS = ("valores", "prefixo", "estadual", "ordem_total")
+GRANULARIDADES = ("dia", "semana", "mes")
+
+
+def _trechos(indices):
+    """Quebra índices ordenados em trechos contíguos [ini, fim)."""
+    if len(indices) == 0:
+        return []
+    quebras = np.flatnonzero(np.diff(indices) != 1) + 1
+    inicios = np.concatenate(([0], quebras))
+    fins = np.concatenate((quebras, [len(indices)]))
+    return [(int(indices[i]), int(indices[f - 1]) + 1) for i, f in zip(inicios, fins)]
+
+
+def soma_movel(matriz, janela):
+    """Soma dos `janela` pontos até cada coluna (parcial no início), pela diferença do prefixo."""
+    if int(janela) != janela or janela < 1:
+        raise ValueError(f"janela inválida: {janela!r} (número inteiro de pontos da granularidade, ≥ 1)")
+    acumulado = np.concatenate((np.zeros((matriz.shape[0], 1)), np.cumsum(matriz, axis=1)), axis=1)
+    t = np.arange(1, matriz.shape[1] + 1)
+    return acumulado[:, t] - acumulado[:, np.maximum(0, t - int(janela))]
+
+
+def _top_combinado(municipios, por_droga, n):
+    soma = por_droga.sum(axis=0)
+    n = min(n, len(soma))
+    if n == 0:
+        return municipios[:0], por_droga[:, :0]
+    parte = np.argpartition(-soma, n - 1)[:n]
+    top = parte[np.lexsort((parte, -soma[parte]))]
+    return municipios[top], por_droga[:, top]
+
+
+class Dimensoes:
+    """Drogas, municípios e meses de um motor de consulta, com os índices usados nas chaves de cache.
+
+    Subclasses preenchem `drogas`, `meses`, `municipios` (np.array, ordem da planilha) e `ano`,
+    e chamam `_indexar()` e `_associar_dimensao()` (código IBGE, -1 sem malha, e população).
+    `diario` é o CuboDiario do ano quando a base diária existe (ver montar_motor).
+    `geracoes` (droga -> nº de recargas a quente) entra nas chaves de cache; a recarga
+    atribui um dict novo ao motor novo, o da classe nunca é alterado.
+    """
+
+    diario = None
+    geracoes = {}
+
+    def geracao(self, droga=None):
+        """Geração dos dados da droga (None = todas as drogas: soma das gerações)."""
+        if droga is None:
+            return sum(self.geracoes.values())
+        return self.geracoes.get(droga, 0)
+
+    def _indexar(self):
+        self._idx_municipio = {m: i for i, m in enumerate(self.municipios)}
+        self._idx_mes = {m: i for i, m in enumerate(self.meses)}
+
+    def idx_municipios(self, municipios=None):
+        """Índices (na ordem da planilha) dos municípios pedidos; None = todos."""
+        if municipios is None:
+            return np.arange(len(self.municipios))
+        idx = [self._idx_municipio[m] for m in municipios if m in self._idx_municipio]
+        return np.unique(np.asarray(idx, dtype=np.intp))
+
+    def idx_meses(self, meses=None):
+        if meses is None:
+            return np.arange(len(self.meses))
+        return np.unique(np.asarray([self._idx_mes[m] for m in meses], dtype=np.intp))
+
+    def nomes_meses(self, meses=None):
+        """Meses pedidos, em ordem de calendário."""
+        return [self.meses[i] for i in self.idx_meses(meses)]
+
+    def selecionar(self, droga, municipios=None, meses=None):
+        return Selecao(self, droga, municipios, meses)
+
+    def mapa(self, droga, municipios=None, meses=None):
+        return self.selecionar(droga, municipios, meses).mapa
+
+    # ------------------------------
+    # Todas as drogas (versão genérica: uma consulta por droga)
+    # ------------------------------
+    def comparativo(self, municipios=None, meses=None):
+        """Formato longo (Droga, Municipio, Mes, Kg) de todas as drogas para a seleção."""
+        partes = [self.longo(d, municipios, meses).assign(Droga=d) for d in self.drogas]
+        df = pd.concat(partes, ignore_index=True) if partes else \
+            pd.DataFrame({"Municipio": [], "Mes": [], "Kg": [], "Droga": []})
+        return df[["Droga", "Municipio", "Mes", "Kg"]]
+
+    def ranking_combinado(self, n=10, meses=None):
+        """Top-n pela soma das drogas; devolve os nomes e a matriz drogas × n (composição)."""
+        por_droga = np.array([self.totais(d, None, meses) for d in self.drogas]).reshape(len(self.drogas), -1)
+        return _top_combinado(self.municipios, por_droga, n)
+
+    def _associar_dimensao(self, dimensao):
+        self.codigos = self.codigos_ibge(dimensao)
+        self.populacao = self.populacao_ibge(dimensao)
+
+    def populacao_ibge(self, dimensao):
+        """População de cada município (NaN sem dado); None se a dimensão não tem população."""
+        if dimensao is None or "populacao" not in dimensao:
+            return None
+        por_codigo = dict(zip(dimensao["codigo_ibge"], dimensao["populacao"]))
+        return np.array([por_codigo.get(c, np.nan) for c in self.codigos], dtype=np.float64)
+
+    def codigos_ibge(self, dimensao):
+        """Código IBGE de cada município (-1 = sem correspondência na malha), resolvido uma vez."""
+        codigos = np.full(len(self.municipios), -1, dtype=np.int64)
+        if dimensao is not None:
+            por_chave = dict(zip(dimensao["nome_ascii"], dimensao["codigo_ibge"]))
+            codigos[:] = [por_chave.get(chave_ascii(m), -1) for m in self.municipios]
+        return codigos
+
+
+class Selecao:
+    """Filtro de uma rerun: índices nos arrays do motor e colunas derivadas, calculadas uma vez.
+
+    Todas as seções recebem o mesmo objeto; cada derivado (totais, tabela, mapa...) é calculado
+    na primeira vez que alguém pede e reaproveitado pelas demais, sem copiar a base filtrada.
+    """
+
+    def __init__(self, motor, droga, municipios=None, meses=None):
+        self.motor = motor
+        self.droga = droga
+        self.municipios = municipios
+        self.meses = meses
+        self.idx_municipios = motor.idx_municipios(municipios)
+        self.idx_meses = motor.idx_meses(meses)
+
+    def chave(self, secao):
+        """Chave normalizada: a mesma seleção em qualquer ordem cai na mesma entrada."""
+        mun = tuple(self.idx_municipios.tolist()) if self.municipios is not None else None
+        mes = tuple(self.idx_meses.tolist()) if self.meses is not None else None
+        return (secao, self.motor.ano, self.droga, self.motor.geracao(self.droga), mun, mes)
+
+    @cached_property
+    def nomes(self):
+        return self.motor.municipios[self.idx_municipios]
+
+    @cached_property
+    def totais(self):
+        return self.motor.totais(self.droga, self.municipios, self.meses)
+
+    @cached_property
+    def tabela(self):
+        return self.motor.tabela(self.droga, self.municipios, self.meses)
+
+    @cached_property
+    def longo(self):
+        return self.motor.longo(self.droga, self.municipios, self.meses)
+
+    @cached_property
+    def selecao(self):
+        return pd.DataFrame({"Municipio": self.nomes, "TotalSelecionado": self.totais})
+
+    @cached_property
+    def mapa(self):
+        """Dados do choropleth e a lista de municípios sem correspondência na malha."""
+        codigos = self.motor.codigos[self.idx_municipios]
+        sem_malha = self.nomes[codigos < 0].tolist()
+        # só as linhas que vão para o mapa (com malha e total > 0) chegam a virar DataFrame
+        manter = (self.totais > 0) & (codigos >= 0)
+        df_mapa = pd.DataFrame({
+            "Municipio": self.nomes[manter],
+            "TotalSelecionado": self.totais[manter],
+            "codigo_ibge": codigos[manter],
+        })
+        return df_mapa, sem_malha
+
+
+class Cubo(Dimensoes):
+    def __init__(self, dados, dimensao=None, ano=None):
+        self.ano = ano
+        dados = {d: df for d, df in dados.items() if not df.empty}
+        self.drogas = list(dados)
+        primeiro = next(iter(dados.values()), pd.DataFrame(columns=["Municipio", "Total"]))
+        self.meses = colunas_mensais(primeiro)
+
+        # municípios na ordem da planilha (união entre as drogas)
+        vistos = {}
+        for df in dados.values():
+            for m in df["Municipio"]:
+                vistos.setdefault(str(m), len(vistos))
+        self.municipios = np.array(list(vistos), dtype=object)
+        self._indexar()
+        self._idx_droga = {d: i for i, d in enumerate(self.drogas)}
+
+        valores = np.zeros((len(self.drogas), len(self.municipios), len(self.meses)), dtype=np.float64)
+        for d, df in dados.items():
+            linhas = [vistos[str(m)] for m in df["Municipio"]]
+            valores[self._idx_droga[d], linhas] = df[self.meses].fillna(0).to_numpy(np.float64)
+        self.valores = valores
+        # prefixo[..., k] = soma dos meses [0, k)
+        self.prefixo = np.concatenate(
+            (np.zeros(valores.shape[:2] + (1,)), np.cumsum(valores, axis=2)), axis=2
+        )
+        # totais estaduais por mês e ordem do total anual, pré-calculados
+        self.estadual = valores.sum(axis=1)
+        self.ordem_total = np.argsort(-self.prefixo[:, :, -1], axis=1, kind="stable")
+
+        self._associar_dimensao(dimensao)
+
+    # ------------------------------
+    # Arquivo compartilhado (mmap)
+    # ------------------------------
+    def gravar(self, destino):
+        """Grava os arrays (.npy) e os rótulos num diretório novo, trocado de uma vez."""
+        destino = Path(destino)
+        if destino.exists():
+            return destino
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        for nome in ARRAYS:
+            np.save(tmp / f"{nome}.npy", getattr(self, nome))
+        with open(tmp / "rotulos.json", "w", encoding="utf-8") as f:
+            json.dump({"drogas": self.drogas, "meses": self.meses,
+                       "municipios": self.municipios.tolist()}, f, ensure_ascii=False)
+        try:
+            os.rename(tmp, destino)
+        except OSError:
+            # outro worker gravou o mesmo cubo antes: fica o dele
+            shutil.rmtree(tmp, ignore_errors=True)
+        return destino
+
+    @classmethod
+    def abrir(cls, origem, dimensao=None, ano=None):
+        """Cubo com os arrays mapeados do disco (somente leitura, compartilhados entre processos)."""
+        origem = Path(origem)
+        with open(origem / "rotulos.json", encoding="utf-8") as f:
+            rotulos = json.load(f)
+        cubo = cls.__new__(cls)
+        cubo.ano = ano
+        cubo.drogas = rotulos["drogas"]
+        cubo.meses = rotulos["meses"]
+        cubo.municipios = np.array(rotulos["municipios"], dtype=object)
+        cubo._indexar()
+        cubo._idx_droga = {d: i for i, d in enumerate(cubo.drogas)}
+        for nome in ARRAYS:
+            setattr(cubo, nome, np.load(origem / f"{nome}.npy", mmap_mode="r"))
+        cubo._associar_dimensao(dimensao)
+        return cubo
+
+    # ------------------------------
+    # Índices
+    # ------------------------------
+    def idx_droga(self, droga):
+        return self._idx_droga[droga]
+
+    # ------------------------------
+    # Consultas
+    # ------------------------------
+    def totais(self, droga, municipios=None, meses=None):
+        """Total de cada município de S nos meses M: O(|S| × trechos contíguos de M)."""
+        d = self.idx_droga(droga)
+        mun = self.idx_municipios(municipios)
+        soma = np.zeros(len(mun))
+        for ini, fim in _trechos(self.idx_meses(meses)):
+            soma += self.prefixo[d, mun, fim] - self.prefixo[d, mun, ini]
+        return soma
+
+    def total(self, droga, municipios=None, meses=None):
+        return float(self.totais(droga, municipios, meses).sum())
+
+    def serie(self, droga, municipios=None, meses=None):
+        """Matriz |S| × |M| com os valores mensais."""
+        mun = self.idx_municipios(municipios)
+        return self.valores[self.idx_droga(droga)][np.ix_(mun, self.idx_meses(meses))]
+
+    def estadual_por_mes(self, droga, meses=None):
+        return self.estadual[self.idx_droga(droga), self.idx_meses(meses)]
+
+    def ranking(self, droga, n=10, meses=None, por_habitantes=False):
+        """Top-n municípios pelo total nos meses M (todos = ano inteiro).
+
+        Ano inteiro usa a ordem pré-calculada; outros meses, as somas prefixadas e seleção
+        parcial (argpartition, O(municípios)) em vez de ordenar tudo. `por_habitantes`
+        divide pela população (kg por 100 mil hab.; municípios sem população ficam de fora).
+        """
+        d = self.idx_droga(droga)
+        if not por_habitantes and (meses is None or len(self.idx_meses(meses)) == len(self.meses)):
+            top = self.ordem_total[d, :n]
+            return self.municipios[top], self.prefixo[d, top, -1]
+
+        valores = self.totais(droga, None, meses)
+        if por_habitantes:
+            if self.populacao is None:
+                raise ValueError("ranking por habitantes requer a população na dimensão de municípios")
+            valores = valores / self.populacao * 100_000
+        candidatos = np.flatnonzero(np.isfinite(valores))
+        n = min(n, len(candidatos))
+        if n == 0:
+            return self.municipios[:0], valores[:0]
+        parte = candidatos[np.argpartition(-valores[candidatos], n - 1)[:n]]
+        # só os n escolhidos são ordenados (empate: ordem da planilha)
+        top = parte[np.lexsort((parte, -valores[parte]))]
+        return self.municipios[top], valores[top]
+
+    def totais_drogas(self, municipios=None, meses=None):
+        """Matriz drogas × |S| com o total de cada município nos meses M, de uma vez."""
+        mun = self.idx_municipios(municipios)
+        soma = np.zeros((len(self.drogas), len(mun)))
+        for ini, fim in _trechos(self.idx_meses(meses)):
+            soma += self.prefixo[:, mun, fim] - self.prefixo[:, mun, ini]
+        return soma
+
+    def ranking_combinado(self, n=10, meses=None):
+        return _top_combinado(self.municipios, self.totais_drogas(None, meses), n)
+
+    # ------------------------------
+    # Saídas em DataFrame para os gráficos
+    # ------------------------------
+    def tabela(self, droga, municipios=None, meses=None):
+        """Municipio + meses selecionados + Total, na ordem da planilha."""
+        mun = self.idx_municipios(municipios)
+        meses = self.nomes_meses(meses)
+        df = pd.DataFrame(self.serie(droga, municipios, meses), columns=meses)
+        df.insert(0, "Municipio", self.municipios[mun])
+        df["Total"] = self.prefixo[self.idx_droga(droga), mun, -1]
+        return df
+
+    def longo(self, droga, municipios=None, meses=None):
+        """Formato longo (Municipio, Mes, Kg) para o gráfico de evolução."""
+        nomes = self.municipios[self.idx_municipios(municipios)]
+        meses = self.nomes_meses(meses)
+        return pd.DataFrame({
+            "Municipio": np.repeat(nomes, len(meses)),
+            "Mes": np.tile(meses, len(nomes)),
+            "Kg": self.serie(droga, municipios, meses).ravel(),
+        })
+
+    def selecao(self, droga, municipios=None, meses=None):
+        """Municipio + TotalSelecionado (soma dos meses escolhidos)."""
+        return self.selecionar(droga, municipios, meses).selecao
+
+    def comparativo(self, municipios=None, meses=None):
+        """Formato longo (Droga, Municipio, Mes, Kg) das drogas alinhadas, num recorte só do cubo."""
+        mun = self.idx_municipios(municipios)
+        mes = self.idx_meses(meses)
+        bloco = self.valores[:, mun][:, :, mes]  # drogas × |S| × |M|
+        d, s, m = bloco.shape
+        return pd.DataFrame({
+            "Droga": np.repeat(np.asarray(self.drogas, dtype=object), s * m),
+            "Municipio": np.tile(np.repeat(self.municipios[mun], m), d),
+            "Mes": np.tile(np.asarray(self.meses, dtype=object)[mes], d * s),
+            "Kg": bloco.ravel(),
+        })
+
+
+class CuboDiario:
+    """Droga × dia × município da base diária, com somas prefixadas nos dias.
+
+    Semanas, meses e somas móveis saem na consulta como diferenças do prefixo
+    (um trecho contíguo de dias custa O(1) por município), sem tabelas pré-agregadas.
+    """
+
+    def __init__(self, diario, ano, municipios=()):
+        self.ano = ano
+        self.dias = pd.date_range(f"{ano}-01-01", f"{ano}-12-31", freq="D").to_numpy()
+        self.drogas = list(pd.unique(diario["droga"].astype(str)))
+        # ordem do cubo mensal primeiro; municípios que só existem na base diária vão para o fim
+        vistos = {str(m): i for i, m in enumerate(municipios)}
+        for m in pd.unique(diario["Municipio"].astype(str)):
+            vistos.setdefault(m, len(vistos))
+        self.municipios = np.array(list(vistos), dtype=object)
+        self._idx_municipio = vistos
+        self._idx_droga = {d: i for i, d in enumerate(self.drogas)}
+
+        valores = np.zeros((len(self.drogas), len(self.dias), len(self.municipios)), dtype=np.float64)
+        dia = (pd.to_datetime(diario["dia"]).to_numpy("datetime64[D]") - self.dias[0].astype("datetime64[D]"))
+        np.add.at(valores, (
+            diario["droga"].astype(str).map(self._idx_droga).to_numpy(np.intp),
+            dia.astype(np.intp),
+            diario["Municipio"].astype(str).map(vistos).to_numpy(np.intp),
+        ), diario["kg"].to_numpy(np.float64))
+        # prefixo[d, t] = soma dos dias [0, t); dias no eixo 1 para as diferenças saírem por município
+        self.prefixo = np.concatenate((np.zeros((len(self.drogas), 1, len(self.municipios))),
+                                       np.cumsum(valores, axis=1)), axis=1)
+        self._mes = pd.DatetimeIndex(self.dias).month.to_numpy()
+        semana = pd.DatetimeIndex(self.dias).to_period("W-SUN").start_time
+        self._semana = semana.to_numpy()
+
+    @classmethod
+    def do_ano(cls, ano, municipios=(), base=serie.SERIE_DIARIA_DIR):
+        """Cubo diário do ano, ou None se a base diária não tem o ano."""
+        diario = serie.ler_diario([ano], base=base)
+        if diario.empty:
+            return None
+        return cls(diario, ano, municipios)
+
+    def _dias_selecionados(self, meses):
+        if meses is None:
+            return np.arange(len(self.dias))
+        numeros = [MESES.index(m) + 1 for m in meses if m in MESES]
+        return np.flatnonzero(np.isin(self._mes, numeros))
+
+    def serie(self, droga, municipios=None, meses=None, granularidade="dia", janela=None):
+        """(nomes, eixo, matriz municípios × pontos) nos dias dos meses pedidos.
+
+        granularidade "dia", "semana" (início na segunda) ou "mes"; com `janela` (inteiro ≥ 1),
+        cada ponto traz a soma dos `janela` pontos da mesma granularidade até ele (parcial no
+        início da seleção).
+        """
+        if granularidade not in GRANULARIDADES:
+            raise ValueError(f"granularidade inválida: {granularidade!r} (use {', '.join(GRANULARIDADES)})")
+        if municipios is None:
+            mun = np.arange(len(self.municipios))
+        else:
+            mun = np.unique(np.asarray([self._idx_municipio[m] for m in municipios if m in self._idx_municipio],
+                                       dtype=np.intp))
+        nomes = self.municipios[mun]
+        dias = self._dias_selecionados(meses)
+        if droga not in self._idx_droga or len(dias) == 0:
+            return nomes, self.dias[dias], np.zeros((len(mun), len(dias)))
+        p = self.prefixo[self._idx_droga[droga]][:, mun]
+
+        if granularidade == "dia":
+            ini = dias
+        else:
+            grupo = self._semana if granularidade == "semana" else self._mes
+            # trechos de dias consecutivos no mesmo grupo (meses fora da seleção quebram o trecho)
+            g = grupo[dias]
+            quebra = np.flatnonzero((g[1:] != g[:-1]) | (np.diff(dias) != 1)) + 1
+            ini = dias[np.concatenate(([0], quebra))]
+            dias = dias[np.concatenate((quebra - 1, [len(dias) - 1]))]
+        matriz = (p[dias + 1] - p[ini]).T
+        if janela:
+            # soma móvel sobre os pontos já agrupados
+            matriz = soma_movel(matriz, janela)
+        return nomes, self.dias[ini], matriz
+
+
+def _fontes(ano):
+    """Arquivos de que o cubo do ano depende (partições da série ou planilhas V2)."""
+    if serie.pa is not None and ano in serie.anos_disponiveis():
+        return sorted(Path(serie.SERIE_DIR).glob(f"ano={int(ano)}/droga=*/*.parquet"))
+    if ano == ANO_PADRAO:
+        return [Path(a) for a in DATA_FILES.values() if Path(a).exists()]
+    return []
+
+
+def impressao(arquivos):
+    """Impressão digital barata das fontes (caminho, mtime, tamanho)."""
+    h = hashlib.sha256()
+    for arq in arquivos:
+        st = os.stat(arq)
+        h.update(f"{arq}:{st.st_mtime_ns}:{st.st_size};".encode())
+    return h.hexdigest()[:16]
+
+
+def compilar_cubo(ano, carregar=dados.carregar, base=CUBO_DIR):
+    """Garante o cubo do ano compilado em disco; devolve o diretório (None se não há dados)."""
+    arquivos = _fontes(ano)
+    if not arquivos:
+        return None
+    destino = Path(base) / f"{int(ano)}-{impressao(arquivos)}"
+    if not destino.exists():
+        cubo = _cubo_das_fontes(ano, carregar)
+        if not cubo.drogas:
+            return None
+        cubo.gravar(destino)
+        # versões antigas do mesmo ano: workers que ainda as mapeiam seguem lendo (unlink no Linux)
+        for antigo in Path(base).glob(f"{int(ano)}-*"):
+            if antigo != destino:
+                shutil.rmtree(antigo, ignore_errors=True)
+    return destino
+
+
+def _cubo_das_fontes(ano, carregar=dados.carregar, dimensao=None):
+    if serie.pa is not None and ano in serie.anos_disponiveis():
+        planilhas = serie.planilhas_ano(ano)
+        # mesma ordem do DATA_FILES; drogas que só existem na série vão para o fim
+        ordem = list(DATA_FILES) + sorted(set(planilhas) - set(DATA_FILES))
+        planilhas = {d: planilhas[d] for d in ordem if d in planilhas}
+    elif ano == ANO_PADRAO:
+        planilhas = {droga: carregar(arquivo) for droga, arquivo in DATA_FILES.items()}
+    else:
+        planilhas = {}
+    return Cubo(planilhas, dimensao=dimensao, ano=ano)
+
+
+def montar_cubo(ano, carregar=dados.carregar):
+    """Cubo de um ano: lê da série histórica quando ela tem o ano, senão das planilhas V2.
+
+    `carregar` lê uma planilha V2 (o app passa a versão com cache/erro do Streamlit).
+    O cubo sai mapeado do arquivo compilado; sem permissão de escrita, fica em memória.
+    """
+    dimensao = geo.dimensao_local()
+    try:
+        origem = compilar_cubo(ano, carregar)
+    except OSError:
+        origem = None
+    if origem is None:
+        return _cubo_das_fontes(ano, carregar, dimensao)
+    return Cubo.abrir(origem, dimensao=dimensao, ano=ano)
+
+
+def montar_motor(ano, carregar=dados.carregar):
+    """Motor de consulta do ano conforme MOTOR_CONSULTA; os dois têm a mesma interface.
+
+    Se a base diária tem o ano, o motor ganha `diario` (granularidade dia/semana e somas móveis).
+    """
+    if MOTOR_CONSULTA == "duckdb":
+        from motor_duckdb import MotorDuckDB
+
+        dimensao = geo.dimensao_local()
+        motor = MotorDuckDB(ano, dimensao=dimensao, carregar=carregar)
+    else:
+        motor = montar_cubo(ano, carregar)
+    motor.diario = CuboDiario.do_ano(ano, motor.municipios)
+    return motor
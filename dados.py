@@ -0,0 +1,143 @@
+# dados.py
+# Carregamento das planilhas de apreensão com cache colunar em disco.
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # sem pyarrow o app continua lendo os CSVs direto
+    pa = None
+
+# ------------------------------
+# Constantes
+# ------------------------------
+DATA_FILES = {
+    "Maconha": "MaconhaV2.csv",
+    "Cocaína": "CocainaV2.csv",
+    "Crack": "CrackV2.csv",
+}
+ANO_PADRAO = 2024  # ano das planilhas V2
+MESES = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+DEFAULT_MUNICIPIOS = ["CURITIBA", "FOZ DO IGUACU", "LONDRINA"]
+CACHE_DIR = "cache"
+VERSAO_CACHE = "2"  # muda quando o formato do cache colunar muda (2: meses em float64)
+COLUNAS_FIXAS = ("Municipio", "Total")
+
+
+def colunas_mensais(df):
+    """Colunas de mês da planilha (tudo que não é Municipio/Total)."""
+    return [c for c in df.columns if c not in COLUNAS_FIXAS]
+
+
+def hash_arquivo(path, bloco=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for pedaco in iter(lambda: f.read(bloco), b""):
+            h.update(pedaco)
+    return h.hexdigest()
+
+
+def caminho_cache(path):
+    path = Path(path)
+    return path.parent / CACHE_DIR / f"{path.stem}.arrow"
+
+
+# ------------------------------
+# Leitura do CSV (fonte)
+# ------------------------------
+def ler_csv(path):
+    df = pd.read_csv(path)
+    df.dropna(subset=["Municipio"], inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    numericas = [c for c in df.columns if c != "Municipio"]
+    # float64: o float32 só guarda ~7 dígitos e erra o grama em totais de dezenas de toneladas
+    df[numericas] = df[numericas].astype(np.float64)
+    df["Municipio"] = df["Municipio"].astype("category")
+    return df
+
+
+# ------------------------------
+# Cache colunar (Arrow IPC, lido via memory map)
+# ------------------------------
+def _metadados_cache(destino):
+    try:
+        with pa.memory_map(str(destino), "r") as fonte:
+            meta = pa.ipc.open_file(fonte).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    return {k.decode(): v.decode() for k, v in meta.items()}
+
+
+def cache_valido(path, destino=None):
+    """True se o cache colunar corresponde ao CSV atual (mtime/tamanho ou, se mudou, hash)."""
+    destino = Path(destino or caminho_cache(path))
+    meta = _metadados_cache(destino)
+    if not meta or meta.get("versao") != VERSAO_CACHE:
+        return False
+    st = os.stat(path)
+    if meta.get("fonte_mtime_ns") == str(st.st_mtime_ns) and meta.get("fonte_tamanho") == str(st.st_size):
+        return True
+    # arquivo tocado (cópia, checkout...) mas talvez com o mesmo conteúdo
+    if meta.get("fonte_sha256") != hash_arquivo(path):
+        return False
+    # mesmo conteúdo: guarda o mtime novo para as próximas cargas não refazerem o hash
+    try:
+        with pa.memory_map(str(destino), "r") as fonte:
+            tabela = pa.ipc.open_file(fonte).read_all()
+        meta.update(fonte_mtime_ns=str(st.st_mtime_ns), fonte_tamanho=str(st.st_size))
+        _gravar_tabela(tabela.replace_schema_metadata(meta), destino)
+    except OSError:
+        pass  # sem permissão de escrita: continua válido, só refaz o hash na próxima
+    return True
+
+
+def _gravar_tabela(tabela, destino):
+    # escreve num temporário e troca de uma vez: leitores nunca veem arquivo pela metade
+    tmp = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+    os.replace(tmp, destino)
+
+
+def compilar_cache(path, destino=None):
+    """Converte o CSV para Arrow IPC (meses em float64, Municipio categórico)."""
+    destino = Path(destino or caminho_cache(path))
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    st = os.stat(path)
+    df = ler_csv(path)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    tabela = tabela.replace_schema_metadata({
+        "versao": VERSAO_CACHE,
+        "fonte": Path(path).name,
+        "fonte_sha256": hash_arquivo(path),
+        "fonte_mtime_ns": str(st.st_mtime_ns),
+        "fonte_tamanho": str(st.st_size),
+    })
+    _gravar_tabela(tabela, destino)
+    return destino
+
+
+def ler_colunar(destino):
+    with pa.memory_map(str(destino), "r") as fonte:
+        tabela = pa.ipc.open_file(fonte).read_all()
+    # split_blocks evita consolidar as colunas: os meses ficam apontando pro mmap
+    return tabela.to_pandas(split_blocks=True)
+
+
+def carregar(path):
+    """Lê a planilha pelo cache colunar, recompilando só quando o CSV mudou."""
+    if pa is None:
+        return ler_csv(path)
+    destino = caminho_cache(path)
+    if not cache_valido(path, destino):
+        try:
+            compilar_cache(path, destino)
+        except OSError:
+            # diretório sem permissão de escrita: segue com o CSV
+            return ler_csv(path)
+    return ler_colunar(destino)
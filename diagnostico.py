@@ -0,0 +1,128 @@
+# diagnostico.py
+# Cronômetros leves por seção (dashboard e API), com saída em log estruturado (JSON por linha)
+# e no formato texto do Prometheus.
+#
+# Log: DIAGNOSTICO_LOG=- (stderr) ou DIAGNOSTICO_LOG=caminho.jsonl.
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger("diagnostico")
+
+# limites dos buckets do histograma (segundos)
+LIMITES_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def configurar_log(destino=None):
+    """Liga o log JSON (uma linha por medição) conforme DIAGNOSTICO_LOG; sem a variável, fica mudo."""
+    destino = destino or os.environ.get("DIAGNOSTICO_LOG")
+    if not destino or log.handlers:
+        return
+    handler = logging.StreamHandler() if destino == "-" else logging.FileHandler(destino, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+
+def _rotulos(rotulos):
+    return ",".join(f'{k}="{v}"' for k, v in sorted(rotulos.items()))
+
+
+class Metricas:
+    """Tempos por seção (histograma) e contadores/medidas com rótulos; seguro entre threads."""
+
+    def __init__(self, prefixo="drogaspr"):
+        self.prefixo = prefixo
+        self._lock = threading.Lock()
+        self._secoes = {}
+        self._contadores = {}
+        self._medidas = {}
+
+    # ------------------------------
+    # Coleta
+    # ------------------------------
+    @contextmanager
+    def medir(self, secao, **extra):
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            yield
+        except Exception as e:  # controle de fluxo do Streamlit (rerun/stop) não conta como erro
+            erro = type(e).__name__
+            raise
+        finally:
+            self.registrar(secao, time.perf_counter() - inicio, erro=erro, **extra)
+
+    def registrar(self, secao, segundos, erro=None, **extra):
+        with self._lock:
+            s = self._secoes.setdefault(secao, {
+                "n": 0, "soma_s": 0.0, "max_s": 0.0, "ultimo_s": 0.0, "erros": 0,
+                "buckets": [0] * len(LIMITES_S),
+            })
+            s["n"] += 1
+            s["soma_s"] += segundos
+            s["max_s"] = max(s["max_s"], segundos)
+            s["ultimo_s"] = segundos
+            s["erros"] += erro is not None
+            for i, limite in enumerate(LIMITES_S):
+                if segundos <= limite:
+                    s["buckets"][i] += 1
+        if log.handlers:
+            evento = {"ts": round(time.time(), 3), "secao": secao, "ms": round(segundos * 1000, 3)}
+            if erro:
+                evento["erro"] = erro
+            evento.update(extra)
+            log.info(json.dumps(evento, ensure_ascii=False))
+
+    def contar(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def definir(self, nome, valor, **rotulos):
+        with self._lock:
+            self._medidas[(nome, tuple(sorted(rotulos.items())))] = valor
+
+    # ------------------------------
+    # Leitura
+    # ------------------------------
+    def secoes(self):
+        """Resumo por seção (ms), na ordem da primeira medição."""
+        with self._lock:
+            return [{
+                "secao": secao,
+                "n": s["n"],
+                "ultimo_ms": s["ultimo_s"] * 1000,
+                "media_ms": s["soma_s"] / s["n"] * 1000,
+                "max_ms": s["max_s"] * 1000,
+                "erros": s["erros"],
+            } for secao, s in self._secoes.items()]
+
+    def valor(self, nome, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            return self._contadores.get(chave, self._medidas.get(chave, 0))
+
+    def prometheus(self):
+        """Exposição em texto (formato 0.0.4 do Prometheus)."""
+        p = self.prefixo
+        linhas = [f"# HELP {p}_secao_segundos Tempo de execução por seção",
+                  f"# TYPE {p}_secao_segundos histogram"]
+        with self._lock:
+            for secao, s in self._secoes.items():
+                for limite, n in zip(LIMITES_S, s["buckets"]):
+                    linhas.append(f'{p}_secao_segundos_bucket{{secao="{secao}",le="{limite}"}} {n}')
+                linhas.append(f'{p}_secao_segundos_bucket{{secao="{secao}",le="+Inf"}} {s["n"]}')
+                linhas.append(f'{p}_secao_segundos_sum{{secao="{secao}"}} {s["soma_s"]:.6f}')
+                linhas.append(f'{p}_secao_segundos_count{{secao="{secao}"}} {s["n"]}')
+            for tipo, valores in (("counter", self._contadores), ("gauge", self._medidas)):
+                for nome in sorted({n for n, _ in valores}):
+                    linhas.append(f"# TYPE {p}_{nome} {tipo}")
+                    for (n, rotulos), v in valores.items():
+                        if n == nome:
+                            linhas.append(f"{p}_{nome}{{{_rotulos(dict(rotulos))}}} {v}")
+        return "\n".join(linhas) + "\n"
@@ -0,0 +1,98 @@
+# exportacao.py
+# Arquivos de exportação (CSV, CSV gzip, Parquet, Arrow IPC), gerados só quando pedidos.
+import gzip
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+LIMITE_EXPORTACOES = 32
+CASAS_EXPORTACAO = 3  # kg com precisão de grama, como na planilha de origem
+
+# nome -> (extensão, mime)
+FORMATOS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+def formatos_disponiveis():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return [f for f in FORMATOS if f.startswith("CSV")]
+    return list(FORMATOS)
+
+
+def tabela_exportacao(cubo, drogas, municipios, meses):
+    """Tabela filtrada; com mais de uma droga, vira um arquivo só com a coluna Droga na frente.
+
+    Os kg saem arredondados ao grama: somas em ponto flutuante não vazam para o arquivo.
+    """
+    if len(drogas) == 1:
+        df = cubo.tabela(drogas[0], municipios, meses)
+    else:
+        partes = [cubo.tabela(d, municipios, meses).assign(Droga=d) for d in drogas]
+        df = pd.concat(partes, ignore_index=True)
+        df = df[["Droga"] + [c for c in df.columns if c != "Droga"]]
+    numericas = df.select_dtypes("number").columns
+    return df.assign(**{c: df[c].astype("float64").round(CASAS_EXPORTACAO) for c in numericas})
+
+
+def serializar(df, formato):
+    if formato == "CSV":
+        return df.to_csv(index=False).encode("utf-8")
+    if formato == "CSV (gzip)":
+        return gzip.compress(df.to_csv(index=False).encode("utf-8"), compresslevel=6)
+
+    import pyarrow as pa
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    if formato == "Parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(tabela, sink, compression="zstd")
+    elif formato == "Arrow IPC":
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    return sink.getvalue()
+
+
+_exportacoes = OrderedDict()
+_lock = threading.Lock()
+
+
+def exportar(cubo, drogas, municipios, meses, formato):
+    """Bytes do arquivo; em cache (LRU) pela seleção do ano e geração das drogas, até invalidar()."""
+    # a geração de cada droga entra na chave: um arquivo montado do motor antigo durante uma
+    # recarga fica com a chave velha e não é servido depois dela
+    chave = (cubo.ano, tuple(drogas), tuple(municipios), tuple(meses), formato,
+             tuple(cubo.geracao(d) for d in drogas))
+    with _lock:
+        if chave in _exportacoes:
+            _exportacoes.move_to_end(chave)
+            return _exportacoes[chave]
+    dados = serializar(tabela_exportacao(cubo, list(drogas), list(municipios), list(meses)), formato)
+    with _lock:
+        _exportacoes[chave] = dados
+        while len(_exportacoes) > LIMITE_EXPORTACOES:
+            _exportacoes.popitem(last=False)
+    return dados
+
+
+def invalidar(ano, droga=None):
+    """Descarta os arquivos do ano que contêm a droga (todos, com droga None)."""
+    with _lock:
+        for chave in [c for c in _exportacoes if c[0] == ano and (droga is None or droga in c[1])]:
+            del _exportacoes[chave]
+
+
+def nome_arquivo(drogas, formato):
+    rotulo = drogas[0].lower() if len(drogas) == 1 else "todas"
+    return f"apreensao_{rotulo}_filtrada.{FORMATOS[formato][0]}"
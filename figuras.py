@@ -0,0 +1,398 @@
+# figuras.py
+# Construção das figuras do dashboard e cache compartilhado (JSON do Plotly) por filtro.
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import geo
+from cubo import soma_movel
+from formatacao import aplicar_ptbr, texttemplate
+
+LIMITE_CACHE_BYTES = 64 * 1024 * 1024
+# evolução mensal: acima de LIMITE_LINHAS municípios o modo automático vira top-K + "Outros";
+# rótulos por ponto só até LIMITE_ROTULOS linhas
+LIMITE_LINHAS = 15
+TOP_LINHAS = 10
+LIMITE_ROTULOS = 10
+LIMITE_PONTOS_ROTULO = 31  # série diária longa: sem rótulo nem marcador por ponto
+
+
+# ------------------------------
+# Cache LRU de figuras
+# ------------------------------
+class CacheFiguras:
+    """LRU de figuras serializadas, limitado em bytes; seguro entre threads/sessões.
+
+    Com `metricas` (diagnostico.Metricas), conta acertos/faltas e mede construção,
+    serialização e tamanho por seção (o primeiro elemento da chave).
+    """
+
+    def __init__(self, limite_bytes=LIMITE_CACHE_BYTES, metricas=None):
+        self.limite_bytes = limite_bytes
+        self.metricas = metricas
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def _medir(self, chave, etapa):
+        return self.metricas.medir(f"{chave[0]}.{etapa}") if self.metricas else nullcontext()
+
+    def _contar(self, chave, resultado):
+        if self.metricas:
+            self.metricas.contar("figuras_cache_total", secao=chave[0], resultado=resultado)
+
+    def _payload(self, chave, texto):
+        if self.metricas:
+            self.metricas.definir("figura_bytes", len(texto), secao=chave[0])
+
+    def obter_json(self, chave, construir):
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                texto = self._itens[chave]
+            else:
+                texto = None
+                self.faltas += 1
+        if texto is not None:
+            self._contar(chave, "acerto")
+            self._payload(chave, texto)
+            return texto
+        self._contar(chave, "falta")
+        # constrói fora do lock: duas sessões podem montar a mesma figura, sem problema
+        with self._medir(chave, "construir"):
+            figura = construir()
+        with self._medir(chave, "serializar"):
+            texto = figura.to_json()
+        self._payload(chave, texto)
+        with self._lock:
+            if chave not in self._itens and len(texto) <= self.limite_bytes:
+                self._itens[chave] = texto
+                self._bytes += len(texto)
+                while self._bytes > self.limite_bytes:
+                    _, antigo = self._itens.popitem(last=False)
+                    self._bytes -= len(antigo)
+                    self.despejos += 1
+        return texto
+
+    def obter(self, chave, construir):
+        """Figura pronta para o st.plotly_chart (reconstruída a partir do JSON em cache)."""
+        texto = self.obter_json(chave, construir)
+        with self._medir(chave, "desserializar"):
+            return pio.from_json(texto)
+
+    def invalidar(self, ano, droga=None):
+        """Descarta as figuras de um ano: só as da droga e as que misturam drogas (droga None na chave)."""
+        with self._lock:
+            for chave in [c for c in self._itens if c[1] == ano and (droga is None or c[2] in (droga, None))]:
+                self._bytes -= len(self._itens.pop(chave))
+        if self.metricas:
+            self.metricas.contar("figuras_invalidadas_total", droga=droga or "todas")
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.faltas
+            return {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "despejos": self.despejos,
+                "taxa_acerto": self.acertos / total if total else 0.0,
+            }
+
+
+def chave_filtros(cubo, secao, droga, municipios=None, meses=None):
+    """Chave normalizada: a mesma seleção em qualquer ordem cai na mesma entrada."""
+    return cubo.selecionar(droga, municipios, meses).chave(secao)
+
+
+# ------------------------------
+# Figuras
+# ------------------------------
+def figura_ranking(cubo, droga, n=10, meses=None, por_habitantes=False):
+    nomes_rank, totais_rank = cubo.ranking(droga, n, meses, por_habitantes)
+    periodo = "Total Anual" if meses is None or len(meses) == len(cubo.meses) else "meses selecionados"
+    medida = "Kg por 100 mil hab." if por_habitantes else "Total"
+    fig_rank = px.bar(
+        x=nomes_rank,
+        y=totais_rank,
+        labels={"x": "Municipio", "y": medida},
+        title=f"Top {n} Municípios - {droga} ({periodo})",
+        text=totais_rank
+    )
+    fig_rank.update_traces(texttemplate=texttemplate(casas=2 if por_habitantes else 0), textposition="outside")
+    return aplicar_ptbr(fig_rank)
+
+
+def figura_evolucao(cubo, droga, municipios, meses, modo="auto", granularidade="mes", janela=None):
+    """Evolução por município no tempo.
+
+    granularidade: "mes" (cubo mensal: planilhas + ocorrências), "semana" ou "dia" (só a base
+    diária de ocorrências, cubo.diario); janela: soma móvel de N pontos da granularidade (dias,
+    semanas ou meses). modo: "linhas" (uma linha por município),
+    "top" (TOP_LINHAS maiores + faixa "Outros"), "webgl" (todas as linhas num único trace
+    Scattergl) ou "auto" (linhas até LIMITE_LINHAS, senão top).
+    """
+    if granularidade == "mes":
+        df_melt = cubo.longo(droga, municipios, meses)
+        nomes = pd.unique(df_melt["Municipio"])
+        eixo = np.asarray(cubo.nomes_meses(meses), dtype=object)
+        # longo vem completo (município × mês, na ordem da planilha): vira matriz sem pivot
+        matriz = df_melt["Kg"].to_numpy(np.float64).reshape(len(nomes), len(eixo))
+        if janela:
+            # mesma fonte do gráfico sem janela: soma móvel sobre os meses do cubo
+            matriz = soma_movel(matriz, janela)
+    else:
+        nomes, eixo, matriz = cubo.diario.serie(droga, municipios, meses, granularidade, janela)
+    eixo_nome = {"dia": "Dia", "semana": "Semana", "mes": "Mes"}[granularidade]
+    if janela:
+        unidade = {"dia": "dias", "semana": "semanas", "mes": "meses"}[granularidade]
+        titulo = f"Soma móvel de {janela} {unidade} - {droga}"
+    else:
+        periodo = {"dia": "diárias", "semana": "semanais", "mes": "mensais"}[granularidade]
+        titulo = f"Evolução das apreensões {periodo} - {droga}"
+    return _desenhar_evolucao(nomes, eixo, matriz, eixo_nome, titulo, modo)
+
+
+def _rotulos_eixo(eixo):
+    if np.issubdtype(np.asarray(eixo).dtype, np.datetime64):
+        return pd.DatetimeIndex(eixo).strftime("%d/%m").tolist()
+    return list(eixo)
+
+
+def _desenhar_evolucao(nomes, eixo, matriz, eixo_nome, titulo, modo):
+    if modo == "auto":
+        modo = "linhas" if len(nomes) <= LIMITE_LINHAS else "top"
+    if modo == "linhas":
+        rotulos = len(nomes) <= LIMITE_ROTULOS and len(eixo) <= LIMITE_PONTOS_ROTULO
+        df_melt = pd.DataFrame({
+            "Municipio": np.repeat(nomes, len(eixo)),
+            eixo_nome: np.tile(eixo, len(nomes)),
+            "Kg": matriz.ravel(),
+        })
+        fig_line = px.line(df_melt, x=eixo_nome, y="Kg", color="Municipio", title=titulo,
+                           markers=len(eixo) <= LIMITE_PONTOS_ROTULO, text="Kg" if rotulos else None)
+        if rotulos:
+            fig_line.update_traces(texttemplate=texttemplate(), textposition="top center")
+        return aplicar_ptbr(fig_line)
+
+    if modo == "webgl":
+        # todas as linhas num trace só, separadas por NaN: um objeto WebGL em vez de ~400 SVG
+        # x inteiro e y float32 vão como arrays binários compactos no JSON (o NaN em y separa
+        # as linhas); os rótulos do eixo ficam só nos ticks
+        x = np.tile(np.arange(len(eixo) + 1, dtype=np.int16), len(nomes))
+        y = np.column_stack((matriz, np.full(len(nomes), np.nan))).ravel().astype(np.float32)
+        # nome em cada ponto seria uma string por município × ponto: cada ponto leva só a posição
+        # do município no ranking (customdata int16, binário) e o nome vai uma vez por linha,
+        # num marcador no último ponto
+        posicao = np.empty(len(nomes), dtype=np.int16)
+        posicao[np.argsort(-matriz.sum(axis=1), kind="stable")] = np.arange(1, len(nomes) + 1)
+        fig_line = go.Figure(go.Scattergl(
+            x=x, y=y, mode="lines", customdata=np.repeat(posicao, len(eixo) + 1), connectgaps=False,
+            line=dict(width=1), opacity=0.6, name="", showlegend=False,
+            hovertemplate="nº %{customdata}<br>%{y:,.3f} kg<extra></extra>",
+        ))
+        if len(eixo):
+            fig_line.add_trace(go.Scattergl(
+                x=np.full(len(nomes), len(eixo) - 1, dtype=np.int16), y=matriz[:, -1].astype(np.float32),
+                mode="markers", marker=dict(size=4), showlegend=False,
+                hovertext=[f"nº {p} {n}" for p, n in zip(posicao.tolist(), nomes)],
+                hovertemplate="%{hovertext}<br>%{y:,.3f} kg<extra></extra>",
+            ))
+        fig_line.update_layout(title=f"{titulo} ({len(nomes)} municípios)", xaxis_title=eixo_nome, yaxis_title="Kg")
+        passo = max(1, -(-len(eixo) // 12))  # no máximo ~12 ticks
+        fig_line.update_xaxes(tickvals=list(range(0, len(eixo), passo)), ticktext=_rotulos_eixo(eixo)[::passo])
+        return aplicar_ptbr(fig_line)
+
+    # top-K pelo total da seleção + o resto somado numa faixa
+    totais = matriz.sum(axis=1)
+    ordem = np.argsort(-totais, kind="stable")
+    top, resto = ordem[:TOP_LINHAS], ordem[TOP_LINHAS:]
+    modo_linha = "lines+markers" if len(eixo) <= LIMITE_PONTOS_ROTULO else "lines"
+    fig_line = go.Figure()
+    if len(resto):
+        fig_line.add_trace(go.Scatter(
+            x=eixo, y=matriz[resto].sum(axis=0), name=f"Outros ({len(resto)} municípios)",
+            mode="lines", fill="tozeroy", line=dict(color="lightgray", width=0),
+        ))
+    for i in top:
+        fig_line.add_trace(go.Scatter(x=eixo, y=matriz[i], name=str(nomes[i]), mode=modo_linha))
+    fig_line.update_layout(title=f"{titulo} (top {len(top)} de {len(nomes)} municípios)",
+                           xaxis_title=eixo_nome, yaxis_title="Kg", legend_title_text="Municipio")
+    return aplicar_ptbr(fig_line)
+
+
+def figura_estadual(cubo, droga, meses):
+    meses_ordenados = cubo.nomes_meses(meses)
+    total_mes = cubo.estadual_por_mes(droga, meses)
+    fig_state = px.bar(
+        x=meses_ordenados,
+        y=total_mes,
+        labels={"x": "Mês", "y": "Total (kg)"},
+        title=f"Total estadual por mês - {droga}",
+        text=total_mes
+    )
+    fig_state.update_traces(texttemplate=texttemplate(), textposition="outside")
+    return aplicar_ptbr(fig_state)
+
+
+def figura_pizza(df_selecao, droga):
+    df_pizza = df_selecao[df_selecao["TotalSelecionado"] > 0]
+    fig_pizza = px.pie(
+        df_pizza,
+        names="Municipio",
+        values="TotalSelecionado",
+        title=f"Distribuição das apreensões por município - {droga}",
+        hole=0.3
+    )
+    fig_pizza.update_traces(textinfo="label+percent+value", texttemplate=texttemplate("value"))
+    return aplicar_ptbr(fig_pizza)
+
+
+def adicionar_contorno_uf(fig, uf_geojson=None, cor="black", largura=2.5, linhas=None, trace=go.Scattergeo):
+    """Desenha o contorno da UF por cima do mapa, num único trace (anéis separados por None).
+
+    `linhas` é o contorno pré-calculado por geo.carregar_contorno_linhas; sem ele,
+    as linhas são montadas a partir de `uf_geojson` (Polygon/MultiPolygon).
+    `trace` é go.Scattergeo (mapa SVG) ou go.Scattermap (mapa WebGL).
+    """
+    linhas = linhas or geo.contorno_em_linhas(uf_geojson)
+    fig.add_trace(trace(
+        lon=linhas["lon"], lat=linhas["lat"],
+        mode="lines",
+        line=dict(color=cor, width=largura),
+        connectgaps=False,
+        hoverinfo="skip",
+        showlegend=False
+    ))
+    return fig
+
+
+def figura_mapa(df_mapa, geojson_mun, contorno_linhas, droga):
+    # --- Choropleth por município
+    fig_map = px.choropleth(
+        df_mapa,
+        geojson=geojson_mun,
+        locations="codigo_ibge",  # casa direto com o id da feature (código IBGE)
+        hover_name="Municipio",
+        color="TotalSelecionado",
+        color_continuous_scale="Plasma",  # Aqui você muda a escala de cores
+        projection="mercator",
+        labels={"TotalSelecionado": "Kg"},
+        title=f"Mapa de apreensões – {droga} (meses selecionados)"
+    )
+
+    # --- Contorno da UF
+    fig_map = adicionar_contorno_uf(fig_map, cor="black", largura=2.5, linhas=contorno_linhas)
+
+    # --- Enquadramento e layout (área maior + margens pequenas)
+    fig_map.update_geos(fitbounds="locations", visible=False)
+    fig_map.update_layout(margin=dict(l=0, r=0, t=60, b=0))
+    return fig_map
+
+
+def figura_mapa_webgl(df_mapa, url_geojson, contorno_linhas, droga):
+    """Choropleth em WebGL (MapLibre): a malha vai por URL e o navegador baixa uma vez só.
+
+    A figura leva apenas código IBGE + total de cada município; trocar filtros não reenvia os polígonos.
+    """
+    # --- Enquadramento pelo contorno da UF (sem fitbounds no modo map)
+    lon, lat = np.asarray(contorno_linhas["lon"], float), np.asarray(contorno_linhas["lat"], float)
+    centro = {"lon": float(np.nanmean([np.nanmin(lon), np.nanmax(lon)])),
+              "lat": float(np.nanmean([np.nanmin(lat), np.nanmax(lat)]))}
+    zoom = float(np.log2(360 / max(np.nanmax(lon) - np.nanmin(lon), 1e-3))) - 0.4
+
+    fig_map = px.choropleth_map(
+        df_mapa,
+        geojson=url_geojson,
+        locations="codigo_ibge",
+        hover_name="Municipio",
+        color="TotalSelecionado",
+        color_continuous_scale="Plasma",
+        map_style="white-bg",  # sem tiles de fundo: nada de rede além da malha local
+        center=centro,
+        zoom=zoom,
+        labels={"TotalSelecionado": "Kg"},
+        title=f"Mapa de apreensões – {droga} (meses selecionados)"
+    )
+    fig_map.update_traces(marker_line_width=0.3)
+    fig_map = adicionar_contorno_uf(fig_map, cor="black", largura=2.5, linhas=contorno_linhas, trace=go.Scattermap)
+    fig_map.update_layout(margin=dict(l=0, r=0, t=60, b=0))
+    return fig_map
+
+
+# ------------------------------
+# Comparação entre drogas
+# ------------------------------
+def figura_comparativo_mensal(df_comp, drogas, meses):
+    """Barras empilhadas por droga: total mensal dos municípios selecionados."""
+    df_mes = df_comp.groupby(["Droga", "Mes"], sort=False, as_index=False)["Kg"].sum()
+    fig = px.bar(
+        df_mes, x="Mes", y="Kg", color="Droga",
+        category_orders={"Mes": list(meses), "Droga": list(drogas)},
+        title="Apreensões por mês - todas as drogas (municípios selecionados)",
+    )
+    fig.update_layout(barmode="stack")
+    return aplicar_ptbr(fig)
+
+
+def figura_comparativo_evolucao(df_comp, drogas, meses, modo="auto"):
+    """Evolução mensal por município, um painel por droga (eixos y independentes).
+
+    Cada painel sai do mesmo desenho da evolução de uma droga (auto/top/webgl/linhas), com a
+    cor de cada município igual em todos os painéis e uma entrada só por município na legenda.
+    """
+    from plotly.subplots import make_subplots
+
+    nomes = pd.unique(df_comp["Municipio"])
+    eixo = np.asarray(meses, dtype=object)
+    # comparativo vem completo (droga × município × mês, nessa ordem): vira um bloco sem pivot
+    bloco = df_comp["Kg"].to_numpy(np.float64).reshape(len(drogas), len(nomes), len(eixo))
+    paleta = px.colors.qualitative.Plotly
+    cores = {str(n): paleta[i % len(paleta)] for i, n in enumerate(nomes)}
+    fig = make_subplots(rows=1, cols=max(len(drogas), 1), subplot_titles=list(drogas))
+    na_legenda = set()
+    for j, droga in enumerate(drogas, start=1):
+        painel = _desenhar_evolucao(nomes, eixo, bloco[j - 1], "Mes", droga, modo)
+        for trace in painel.data:
+            nome = trace.name or ""
+            if nome in cores:
+                trace.update(line_color=cores[nome], marker_color=cores[nome])
+            if trace.showlegend is not False:
+                trace.update(legendgroup=nome, showlegend=nome not in na_legenda)
+                na_legenda.add(nome)
+            fig.add_trace(trace, row=1, col=j)
+        eixo_x = painel.layout.xaxis
+        if eixo_x.tickvals is not None:  # webgl: x numérico, nomes dos meses nos ticks
+            fig.update_xaxes(tickvals=eixo_x.tickvals, ticktext=eixo_x.ticktext, row=1, col=j)
+    fig.update_layout(title=f"Evolução mensal por município - comparação entre drogas ({len(nomes)} municípios)",
+                      legend_title_text="Municipio")
+    return aplicar_ptbr(fig)
+
+
+def figura_ranking_combinado(cubo, n=10, meses=None):
+    """Top-n pela soma das drogas, com a composição por droga empilhada."""
+    nomes, por_droga = cubo.ranking_combinado(n, meses)
+    fig = go.Figure([go.Bar(name=d, x=nomes, y=por_droga[i]) for i, d in enumerate(cubo.drogas)])
+    fig.add_trace(go.Scatter(
+        x=nomes, y=por_droga.sum(axis=0), mode="text", text=por_droga.sum(axis=0),
+        texttemplate=texttemplate(), textposition="top center", showlegend=False, hoverinfo="skip",
+    ))
+    fig.update_layout(barmode="stack", title=f"Top {n} Municípios - todas as drogas (soma em kg)",
+                      xaxis_title="Municipio", yaxis_title="Total")
+    return aplicar_ptbr(fig)
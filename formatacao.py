@@ -0,0 +1,48 @@
+# formatacao.py
+# Números no padrão pt-BR (1.234,567), formatados coluna a coluna com NumPy.
+import numpy as np
+import pandas as pd
+
+# separadores do Plotly: primeiro o decimal, depois o de milhar
+SEPARADORES_PLOTLY = ",."
+
+
+def formatar_numeros(valores, casas=0):
+    """Formata um vetor numérico como texto pt-BR, sem laço Python por célula."""
+    x = np.asarray(valores, dtype=np.float64)
+    nulo = np.isnan(x)
+    escala = 10 ** casas
+    escalado = np.rint(np.abs(np.where(nulo, 0, x)) * escala).astype(np.int64)
+    inteiro, fracao = np.divmod(escalado, escala)
+
+    # parte inteira: grupos de 3 dígitos com zero à esquerda, depois tira os zeros iniciais
+    grupos = -(-len(str(int(inteiro.max(initial=0)))) // 3)
+    texto = np.char.mod("%03d", inteiro // 1000 ** (grupos - 1) % 1000)
+    for g in range(grupos - 2, -1, -1):
+        texto = np.char.add(np.char.add(texto, "."), np.char.mod("%03d", inteiro // 1000 ** g % 1000))
+    texto = np.char.lstrip(texto, "0.")
+    texto = np.where(texto == "", "0", texto)
+
+    if casas > 0:
+        texto = np.char.add(np.char.add(texto, ","), np.char.mod(f"%0{casas}d", fracao))
+    texto = np.where((x < 0) & (escalado > 0), np.char.add("-", texto), texto)
+    return np.where(nulo, "", texto).astype(object)
+
+
+def formatar_tabela(df, casas=0):
+    """Cópia do DataFrame com as colunas numéricas já formatadas em pt-BR."""
+    saida = df.copy()
+    for col in saida.columns:
+        if pd.api.types.is_numeric_dtype(saida[col]):
+            saida[col] = formatar_numeros(saida[col].to_numpy(), casas)
+    return saida
+
+
+def texttemplate(campo="text", casas=0):
+    """Template de texto do Plotly; usar junto com `aplicar_ptbr` no layout."""
+    return f"%{{{campo}:,.{casas}f}}"
+
+
+def aplicar_ptbr(fig):
+    fig.update_layout(separators=SEPARADORES_PLOTLY)
+    return fig
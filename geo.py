@@ -0,0 +1,300 @@
+# geo.py
+# Malhas do Paraná: gera uma vez um artefato local simplificado e o app só lê do disco.
+#
+# Uso (build/CI, com acesso à rede ou com os arquivos já baixados):
+#   python geo.py
+#   python geo.py --municipios geojs-41-mun.json --contorno br_pr.json --tolerancia 0.002
+#
+# Em execução nada vai à rede: sem os artefatos, a leitura falha com ArtefatoAusente.
+#
+# População (opcional, liga o ranking per capita): geo/populacao_pr.csv com as colunas
+# codigo_ibge,populacao, uma linha por município do PR, tirada das estimativas anuais do
+# IBGE (SIDRA, tabela 6579 "população residente estimada", nível município, UF 41).
+# O arquivo precisa cobrir todos os códigos da dimensão; incompleto, é ignorado.
+import argparse
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+log = logging.getLogger("geo")
+
+# ------------------------------
+# Constantes
+# ------------------------------
+URL_MUNICIPIOS = "https://raw.githubusercontent.com/tbrugz/geodata-br/master/geojson/geojs-41-mun.json"
+URL_CONTORNO = "https://raw.githubusercontent.com/giuliano-macedo/geodata-br-states/main/geojson/br_states/br_pr.json"
+GEO_DIR = Path(__file__).parent / "geo"
+ARQ_MUNICIPIOS = GEO_DIR / "municipios_pr.json"
+ARQ_CONTORNO = GEO_DIR / "contorno_pr.json"
+ARQ_CONTORNO_LINHAS = GEO_DIR / "contorno_pr_linhas.npy"  # 2 × N (lon, lat), NaN entre anéis
+ARQ_DIMENSAO = GEO_DIR / "dim_municipios.csv"
+ARQ_POPULACAO = GEO_DIR / "populacao_pr.csv"  # opcional: codigo_ibge,populacao (estimativas do IBGE)
+# cópia servida pelo Streamlit (server.enableStaticServing) para o mapa WebGL baixar uma vez
+STATIC_DIR = Path(__file__).parent / "static"
+ARQ_MUNICIPIOS_ESTATICO = STATIC_DIR / "municipios_pr.json"
+URL_ESTATICO = "app/static"
+TOLERANCIA_PADRAO = 0.001  # graus (~100 m)
+CASAS_PADRAO = 4           # quantização das coordenadas (~10 m)
+
+
+# ------------------------------
+# Simplificação (Douglas-Peucker)
+# ------------------------------
+def douglas_peucker(pontos, tolerancia):
+    """Mantém só os vértices que se afastam mais que `tolerancia` da reta entre os extremos."""
+    pts = np.asarray(pontos, dtype=float)
+    if len(pts) < 3 or tolerancia <= 0:
+        return pts
+    manter = np.zeros(len(pts), dtype=bool)
+    manter[0] = manter[-1] = True
+    pilha = [(0, len(pts) - 1)]
+    while pilha:
+        ini, fim = pilha.pop()
+        if fim - ini < 2:
+            continue
+        a, b = pts[ini], pts[fim]
+        meio = pts[ini + 1:fim]
+        ab = b - a
+        norma = np.hypot(*ab)
+        if norma == 0:
+            dist = np.hypot(*(meio - a).T)
+        else:
+            dist = np.abs(ab[0] * (meio[:, 1] - a[1]) - ab[1] * (meio[:, 0] - a[0])) / norma
+        i = int(np.argmax(dist))
+        if dist[i] > tolerancia:
+            k = ini + 1 + i
+            manter[k] = True
+            pilha.append((ini, k))
+            pilha.append((k, fim))
+    return pts[manter]
+
+
+def simplificar_anel(anel, tolerancia, casas):
+    pts = douglas_peucker(anel, tolerancia)
+    # anel precisa de ao menos 4 pontos (triângulo fechado); se colapsou, fica o original
+    if len(pts) < 4:
+        pts = np.asarray(anel, dtype=float)
+    return np.round(pts, casas).tolist()
+
+
+def simplificar_geometria(geom, tolerancia=TOLERANCIA_PADRAO, casas=CASAS_PADRAO):
+    if geom["type"] == "Polygon":
+        coords = [simplificar_anel(anel, tolerancia, casas) for anel in geom["coordinates"]]
+    elif geom["type"] == "MultiPolygon":
+        coords = [[simplificar_anel(anel, tolerancia, casas) for anel in poligono]
+                  for poligono in geom["coordinates"]]
+    else:
+        return geom
+    return {"type": geom["type"], "coordinates": coords}
+
+
+# ------------------------------
+# Build do artefato
+# ------------------------------
+def ler_origem(origem, timeout=30):
+    """Lê um GeoJSON de um arquivo local ou, se for URL, baixa (só no build)."""
+    if str(origem).startswith(("http://", "https://")):
+        import requests
+        return requests.get(origem, timeout=timeout).json()
+    with open(origem, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def gravar_json(obj, destino):
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, destino)
+    return destino
+
+
+def gravar_linhas(linhas, destino):
+    """Polilinha como array float64 (None vira NaN), para abrir com mmap nos workers."""
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_name(f".{destino.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp, np.array([linhas["lon"], linhas["lat"]], dtype=np.float64))
+    os.replace(tmp, destino)
+    return destino
+
+
+def chave_ascii(nome):
+    """Nome normalizado (sem acento, maiúsculo), o mesmo usado nas planilhas."""
+    from unidecode import unidecode
+
+    return unidecode(str(nome)).strip().upper()
+
+
+def codigo_ibge(feature):
+    props = feature["properties"]
+    return int(props.get("codigo_ibge") or props.get("id") or feature["id"])
+
+
+def construir_dimensao(gj, destino=ARQ_DIMENSAO):
+    """Tabela de municípios: código IBGE, nome, chave ASCII e posição da feature na malha."""
+    import pandas as pd
+
+    dim = pd.DataFrame({
+        "codigo_ibge": [codigo_ibge(f) for f in gj["features"]],
+        "nome": [f["properties"]["name"] for f in gj["features"]],
+        "nome_ascii": [chave_ascii(f["properties"]["name"]) for f in gj["features"]],
+        "feature_id": range(len(gj["features"])),
+    })
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    dim.to_csv(tmp, index=False)
+    os.replace(tmp, destino)
+    return destino
+
+
+def construir_municipios(origem=URL_MUNICIPIOS, destino=ARQ_MUNICIPIOS,
+                         tolerancia=TOLERANCIA_PADRAO, casas=CASAS_PADRAO,
+                         destino_dimensao=ARQ_DIMENSAO):
+    gj = ler_origem(origem)
+    for f in gj["features"]:
+        f["geometry"] = simplificar_geometria(f["geometry"], tolerancia, casas)
+        # o choropleth casa pelo id da feature (código IBGE inteiro), sem comparar nomes
+        f["id"] = codigo_ibge(f)
+        f["properties"]["codigo_ibge"] = f["id"]
+        f["properties"]["name_ascii"] = chave_ascii(f["properties"]["name"])
+    construir_dimensao(gj, destino_dimensao)
+    return gravar_json(gj, destino)
+
+
+def contorno_em_linhas(uf_geojson):
+    """Todos os anéis da UF numa só polilinha, separados por None (um único trace)."""
+    geom = uf_geojson["features"][0]["geometry"]
+    coords = geom["coordinates"]
+    multipoligonos = coords if geom["type"] == "MultiPolygon" else [coords]
+    lons, lats = [], []
+    for poligono in multipoligonos:   # poligono = [anel_externo, aneis_internos...]
+        for anel in poligono:         # anel = lista de [lon, lat]
+            if lons:
+                lons.append(None)
+                lats.append(None)
+            lons.extend(p[0] for p in anel)
+            lats.extend(p[1] for p in anel)
+    return {"lon": lons, "lat": lats}
+
+
+def construir_contorno(origem=URL_CONTORNO, destino=ARQ_CONTORNO,
+                       tolerancia=TOLERANCIA_PADRAO, casas=CASAS_PADRAO,
+                       destino_linhas=ARQ_CONTORNO_LINHAS):
+    gj = ler_origem(origem)
+    for f in gj["features"]:
+        f["geometry"] = simplificar_geometria(f["geometry"], tolerancia, casas)
+    # contorno já no formato do trace, gravado ao lado do GeoJSON
+    gravar_linhas(contorno_em_linhas(gj), destino_linhas)
+    return gravar_json(gj, destino)
+
+
+# ------------------------------
+# Leitura (app)
+# ------------------------------
+class ArtefatoAusente(FileNotFoundError):
+    """Malha local não gerada; o app não baixa nada em execução."""
+
+    def __init__(self, path):
+        super().__init__(f"Malha local ausente: {path}. Gere os artefatos com `python geo.py` (passo de build).")
+
+
+def exigir(path):
+    if not Path(path).exists():
+        raise ArtefatoAusente(path)
+    return Path(path)
+
+
+def carregar_municipios(path=ARQ_MUNICIPIOS):
+    with open(exigir(path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publicar_municipios(origem=ARQ_MUNICIPIOS, destino=ARQ_MUNICIPIOS_ESTATICO):
+    """Copia a malha para static/ (se mudou) e devolve a URL relativa, versionada pelo mtime.
+
+    O navegador baixa o GeoJSON uma vez e o reaproveita do cache HTTP; a versão na URL
+    força o download de novo só quando o artefato é regerado. O `python geo.py` já publica;
+    em execução só copia se o build não o fez (OSError se static/ não aceita escrita).
+    """
+    origem, destino = exigir(origem), Path(destino)
+    if not destino.exists() or destino.stat().st_mtime_ns < origem.stat().st_mtime_ns:
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+        shutil.copyfile(origem, tmp)
+        os.replace(tmp, destino)
+    return f"{URL_ESTATICO}/{destino.name}?v={destino.stat().st_mtime_ns}"
+
+
+def carregar_dimensao(path=ARQ_DIMENSAO, municipios=ARQ_MUNICIPIOS, populacao=ARQ_POPULACAO):
+    """Dimensão de municípios; se ainda não foi gerada, monta a partir da malha local.
+
+    Com o arquivo de população presente e completo, ganha a coluna `populacao` (rankings per capita).
+    """
+    import pandas as pd
+
+    if not Path(path).exists():
+        construir_dimensao(carregar_municipios(municipios), path)
+    dim = pd.read_csv(path, dtype={"codigo_ibge": "int64", "feature_id": "int64"})
+    if Path(populacao).exists():
+        pop = pd.read_csv(populacao, usecols=["codigo_ibge", "populacao"], dtype={"codigo_ibge": "int64"})
+        faltando = validar_populacao(dim, pop)
+        if faltando:
+            log.warning("%s sem população para %d municípios (ex.: %s); ranking per capita desligado",
+                        populacao, len(faltando), ", ".join(map(str, faltando[:5])))
+        else:
+            dim = dim.merge(pop, on="codigo_ibge", how="left")
+    return dim
+
+
+def validar_populacao(dim, pop):
+    """Códigos IBGE da dimensão sem população positiva no arquivo (lista vazia = completo)."""
+    validos = set(pop.loc[pop["populacao"] > 0, "codigo_ibge"])
+    return [int(c) for c in dim["codigo_ibge"] if c not in validos]
+
+
+def dimensao_local(path=ARQ_DIMENSAO):
+    """Dimensão de municípios se o build já a gerou; None = motor só com os nomes (mapa indisponível)."""
+    return carregar_dimensao(path) if Path(path).exists() else None
+
+
+def carregar_contorno(path=ARQ_CONTORNO):
+    with open(exigir(path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def carregar_contorno_linhas(path=ARQ_CONTORNO_LINHAS, contorno=ARQ_CONTORNO):
+    """Contorno pré-calculado (mmap somente leitura); se não houver, calcula a partir do GeoJSON da UF."""
+    try:
+        lon, lat = np.load(path, mmap_mode="r")
+    except FileNotFoundError:
+        return contorno_em_linhas(carregar_contorno(contorno))
+    return {"lon": lon, "lat": lat}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera as malhas locais simplificadas do PR.")
+    parser.add_argument("--municipios", default=URL_MUNICIPIOS, help="URL ou arquivo GeoJSON dos municípios")
+    parser.add_argument("--contorno", default=URL_CONTORNO, help="URL ou arquivo GeoJSON do contorno da UF")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO, help="tolerância Douglas-Peucker (graus)")
+    parser.add_argument("--casas", type=int, default=CASAS_PADRAO, help="casas decimais mantidas nas coordenadas")
+    args = parser.parse_args(argv)
+
+    for nome, origem, construir in (
+        ("municípios", args.municipios, construir_municipios),
+        ("contorno", args.contorno, construir_contorno),
+    ):
+        destino = construir(origem, tolerancia=args.tolerancia, casas=args.casas)
+        print(f"{nome}: {destino} ({destino.stat().st_size / 1024:.0f} KiB)")
+    # cópia estática do mapa WebGL sai no build: em execução a imagem pode ser só de leitura
+    print(f"estático: {publicar_municipios()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# motor_duckdb.py
+# Motor de consulta alternativo: filtros e agregações do dashboard em SQL no DuckDB (em processo).
+#
+# Registra a série histórica (Parquet particionado, ver serie.py) ou, sem ela, as planilhas V2
+# como a view `apreensoes(droga, Municipio, mes, kg)` e responde às mesmas consultas do Cubo
+# (tabela, selecao, longo, ranking, estadual_por_mes; o mapa sai da Selecao comum). O DuckDB
+# varre o Parquet direto do disco, sem copiar a base inteira para o pandas; os resultados saem em Arrow.
+#
+# Ativado com a variável de ambiente MOTOR_CONSULTA=duckdb.
+import threading
+
+import numpy as np
+import pandas as pd
+
+import dados
+import serie
+from cubo import Dimensoes
+from dados import ANO_PADRAO, DATA_FILES, MESES
+
+try:
+    import duckdb
+except ImportError:  # motor opcional
+    duckdb = None
+
+
+def _para_arrow(resultado):
+    # DuckDB >= 1.4 devolve um RecordBatchReader em .arrow(); versões antigas, uma Table
+    tabela = resultado.arrow()
+    return tabela.read_all() if hasattr(tabela, "read_all") else tabela
+
+
+class MotorDuckDB(Dimensoes):
+    def __init__(self, ano, dimensao=None, base=serie.SERIE_DIR, arquivos=DATA_FILES, carregar=dados.carregar):
+        if duckdb is None:
+            raise ImportError("MOTOR_CONSULTA=duckdb requer o pacote duckdb")
+        self.ano = ano
+        self.con = duckdb.connect()
+        self._lock = threading.Lock()  # uma conexão compartilhada entre sessões
+
+        if serie.pa is not None and ano in serie.anos_disponiveis(base):
+            caminho = (base / "*" / "*" / "*.parquet").as_posix()
+            self.con.execute(f"""
+                CREATE VIEW apreensoes AS
+                SELECT droga, Municipio, mes, kg
+                FROM read_parquet('{caminho}', hive_partitioning = true)
+                WHERE ano = {int(ano)}
+            """)
+        else:
+            # sem série: planilhas V2 em formato longo (pequenas; o caminho escalável é o Parquet)
+            partes = []
+            for droga, arquivo in (arquivos.items() if ano == ANO_PADRAO else []):
+                try:
+                    df = carregar(arquivo)
+                except FileNotFoundError:
+                    continue
+                if not df.empty:
+                    partes.append(serie.larga_para_longa(df).assign(droga=droga))
+            longo = pd.concat(partes, ignore_index=True) if partes else \
+                pd.DataFrame({"droga": [], "Municipio": [], "mes": [], "kg": []})
+            self.con.register("apreensoes_v2", longo)
+            self.con.execute("CREATE VIEW apreensoes AS SELECT droga, Municipio, mes, kg FROM apreensoes_v2")
+
+        presentes = {r[0] for r in self.con.execute("SELECT DISTINCT droga FROM apreensoes").fetchall()}
+        self.drogas = [d for d in arquivos if d in presentes] + sorted(presentes - set(arquivos))
+        meses = [r[0] for r in self.con.execute("SELECT DISTINCT mes FROM apreensoes ORDER BY mes").fetchall()]
+        self.meses = [MESES[m - 1] for m in meses]
+        # ordem de primeira aparição, como no cubo
+        nomes = self.con.execute(
+            "SELECT Municipio FROM (SELECT Municipio, row_number() OVER () AS n FROM apreensoes) "
+            "GROUP BY Municipio ORDER BY min(n)"
+        ).fetchall()
+        self.municipios = np.array([str(r[0]) for r in nomes], dtype=object)
+        self._indexar()
+        self._associar_dimensao(dimensao)
+
+        # dimensão de municípios (ordem + código IBGE + população) para joins e ordenação
+        self.con.register("dim_municipios_df", pd.DataFrame({
+            "Municipio": self.municipios.astype(str),
+            "ordem": np.arange(len(self.municipios)),
+            "codigo_ibge": self.codigos,
+            "populacao": self.populacao if self.populacao is not None else np.full(len(self.municipios), np.nan),
+        }))
+        self.con.execute("CREATE TABLE dim_municipios AS SELECT * FROM dim_municipios_df")
+
+    # ------------------------------
+    # Execução
+    # ------------------------------
+    def _consultar(self, sql, params=()):
+        with self._lock:
+            return _para_arrow(self.con.execute(sql, list(params)))
+
+    def _filtros(self, municipios, meses):
+        mun = self.municipios[self.idx_municipios(municipios)].astype(str).tolist()
+        mes = [MESES.index(m) + 1 for m in self.nomes_meses(meses)]
+        return mun, mes
+
+    # ------------------------------
+    # Consultas (mesma interface do Cubo)
+    # ------------------------------
+    def tabela(self, droga, municipios=None, meses=None):
+        mun, mes = self._filtros(municipios, meses)
+        colunas = ", ".join(
+            f'coalesce(sum(a.kg) FILTER (WHERE a.mes = {m}), 0) AS "{MESES[m - 1]}"' for m in mes
+        )
+        sql = f"""
+            SELECT d.Municipio{', ' + colunas if colunas else ''}, coalesce(sum(a.kg), 0) AS Total
+            FROM dim_municipios d
+            LEFT JOIN apreensoes a ON a.Municipio = d.Municipio AND a.droga = ?
+            WHERE list_contains(?, d.Municipio)
+            GROUP BY d.Municipio, d.ordem
+            ORDER BY d.ordem
+        """
+        return self._consultar(sql, (droga, mun)).to_pandas()
+
+    def selecao(self, droga, municipios=None, meses=None):
+        mun, mes = self._filtros(municipios, meses)
+        sql = """
+            SELECT d.Municipio, coalesce(sum(a.kg) FILTER (WHERE list_contains(?, a.mes)), 0) AS TotalSelecionado
+            FROM dim_municipios d
+            LEFT JOIN apreensoes a ON a.Municipio = d.Municipio AND a.droga = ?
+            WHERE list_contains(?, d.Municipio)
+            GROUP BY d.Municipio, d.ordem
+            ORDER BY d.ordem
+        """
+        return self._consultar(sql, (mes, droga, mun)).to_pandas()
+
+    def totais(self, droga, municipios=None, meses=None):
+        return self.selecao(droga, municipios, meses)["TotalSelecionado"].to_numpy()
+
+    def longo(self, droga, municipios=None, meses=None):
+        mun, mes = self._filtros(municipios, meses)
+        sql = """
+            SELECT d.Municipio, m.mes, coalesce(sum(a.kg), 0) AS Kg
+            FROM dim_municipios d
+            CROSS JOIN (SELECT unnest(?::INTEGER[]) AS mes) m
+            LEFT JOIN apreensoes a ON a.Municipio = d.Municipio AND a.mes = m.mes AND a.droga = ?
+            WHERE list_contains(?, d.Municipio)
+            GROUP BY d.Municipio, d.ordem, m.mes
+            ORDER BY d.ordem, m.mes
+        """
+        df = self._consultar(sql, (mes, droga, mun)).to_pandas()
+        df.insert(1, "Mes", [MESES[m - 1] for m in df.pop("mes")])
+        return df
+
+    def ranking(self, droga, n=10, meses=None, por_habitantes=False):
+        if por_habitantes and self.populacao is None:
+            raise ValueError("ranking por habitantes requer a população na dimensão de municípios")
+        _, mes = self._filtros(None, meses)
+        valor = "sum(a.kg) / d.populacao * 100000" if por_habitantes else "sum(a.kg)"
+        sql = f"""
+            SELECT d.Municipio, {valor} AS Total
+            FROM apreensoes a JOIN dim_municipios d USING (Municipio)
+            WHERE a.droga = ? AND list_contains(?, a.mes){" AND d.populacao > 0" if por_habitantes else ""}
+            GROUP BY d.Municipio, d.ordem, d.populacao
+            ORDER BY Total DESC, d.ordem
+            LIMIT ?
+        """
+        df = self._consultar(sql, (droga, mes, int(n))).to_pandas()
+        return df["Municipio"].to_numpy(dtype=object), df["Total"].to_numpy()
+
+    def estadual_por_mes(self, droga, meses=None):
+        _, mes = self._filtros(None, meses)
+        sql = """
+            SELECT m.mes, coalesce(sum(a.kg), 0) AS Total
+            FROM (SELECT unnest(?::INTEGER[]) AS mes) m
+            LEFT JOIN apreensoes a ON a.mes = m.mes AND a.droga = ?
+            GROUP BY m.mes
+            ORDER BY m.mes
+        """
+        return self._consultar(sql, (mes, droga)).to_pandas()["Total"].to_numpy()
@@ -0,0 +1,127 @@
+# registro.py
+# Registro somente leitura dos dados carregados (planilhas, malhas), servidos por referência.
+#
+# O st.cache_data devolve uma cópia (pickle ida e volta) a cada chamada; aqui cada item é
+# carregado uma vez por processo, congelado (arrays NumPy sem escrita, GeoJSON imutável) e
+# entregue por referência. As estatísticas mostram quanto tempo de cópia deixou de ser gasto.
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------
+# Congelamento
+# ------------------------------
+class DictSomenteLeitura(dict):
+    """dict que recusa alterações; pickle/deepcopy devolvem um dict comum (ex.: cópia do Plotly)."""
+
+    def _somente_leitura(self, *args, **kwargs):
+        raise TypeError("dados do registro são somente leitura")
+
+    __setitem__ = __delitem__ = update = pop = popitem = clear = setdefault = _somente_leitura
+    __ior__ = _somente_leitura
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+def congelar(obj):
+    """Versão imutável de obj: listas viram tuplas, dicts viram DictSomenteLeitura, arrays sem escrita."""
+    if isinstance(obj, pd.DataFrame):
+        for col in obj.columns:
+            valores = obj[col].array
+            if isinstance(valores, np.ndarray):
+                valores.setflags(write=False)
+            elif hasattr(valores, "_ndarray"):  # NumpyExtensionArray
+                valores._ndarray.setflags(write=False)
+        return obj
+    if isinstance(obj, np.ndarray):
+        obj.setflags(write=False)
+        return obj
+    if isinstance(obj, dict):
+        return DictSomenteLeitura({k: congelar(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(congelar(v) for v in obj)
+    return obj
+
+
+def _servir(obj):
+    # DataFrame: cópia rasa (copy-on-write), os dados continuam sendo os do registro;
+    # assim uma coluna nova numa sessão não aparece nas outras
+    return obj.copy(deep=False) if isinstance(obj, pd.DataFrame) else obj
+
+
+def custo_copia(obj):
+    """Segundos e bytes de uma ida e volta por pickle (o que o st.cache_data paga a cada acerto)."""
+    inicio = time.perf_counter()
+    dados = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.loads(dados)
+    return time.perf_counter() - inicio, len(dados)
+
+
+# ------------------------------
+# Registro
+# ------------------------------
+class Registro:
+    """Itens imutáveis por chave, carregados uma vez e compartilhados entre sessões/threads."""
+
+    def __init__(self, medir_copia=True):
+        self.medir_copia = medir_copia
+        self._itens = {}
+        self._info = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave, carregar):
+        with self._lock:
+            if chave in self._itens:
+                self._info[chave]["acertos"] += 1
+                return _servir(self._itens[chave])
+        # carrega fora do lock; exceções (arquivo ausente...) não ficam registradas
+        inicio = time.perf_counter()
+        obj = congelar(carregar())
+        carga = time.perf_counter() - inicio
+        copia, tamanho = custo_copia(obj) if self.medir_copia else (0.0, 0)
+        with self._lock:
+            if chave not in self._itens:
+                self._itens[chave] = obj
+                self._info[chave] = {"acertos": 0, "carga_s": carga, "copia_s": copia, "bytes": tamanho}
+            return _servir(self._itens[chave])
+
+    def trocar(self, chave, obj):
+        """Substitui o item de uma vez (recarga em segundo plano); quem já tem o antigo segue com ele."""
+        obj = congelar(obj)
+        copia, tamanho = custo_copia(obj) if self.medir_copia else (0.0, 0)
+        with self._lock:
+            self._itens[chave] = obj
+            self._info[chave] = {"acertos": 0, "carga_s": 0.0, "copia_s": copia, "bytes": tamanho}
+
+    def atual(self, chave):
+        """Item carregado (sem contar acerto nem carregar); None se não existe."""
+        with self._lock:
+            return self._itens.get(chave)
+
+    def invalidar(self, chave=None):
+        """Descarta um item (ou todos); o próximo obter recarrega."""
+        with self._lock:
+            if chave is None:
+                self._itens.clear()
+                self._info.clear()
+            else:
+                self._itens.pop(chave, None)
+                self._info.pop(chave, None)
+
+    def estatisticas(self):
+        with self._lock:
+            itens = {str(k): dict(v) for k, v in self._info.items()}
+        for info in itens.values():
+            info["copia_evitada_s"] = info["acertos"] * info["copia_s"]
+        return {
+            "itens": len(itens),
+            "acertos": sum(i["acertos"] for i in itens.values()),
+            "bytes": sum(i["bytes"] for i in itens.values()),
+            "copia_evitada_s": sum(i["copia_evitada_s"] for i in itens.values()),
+            "por_item": itens,
+        }
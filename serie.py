@@ -0,0 +1,236 @@
+# serie.py
+# Série histórica em formato longo, particionada por ano e droga (Parquet, estilo hive):
+#
+#   serie/ano=2024/droga=Maconha/dados.parquet   (Municipio, mes, kg)
+#
+# Cada consulta lê só as partições de que precisa (poda por ano/droga).
+#
+# Ocorrências individuais (trat.py --ocorrencias) ficam numa base diária só de acréscimos:
+#
+#   serie_diaria/ano=2025/droga=Crack/<lote>.parquet   (Municipio, dia, kg)
+#
+# consolidada por mês num arquivo próprio ao lado do que veio da planilha:
+#
+#   serie/ano=2025/droga=Crack/ocorrencias.parquet     (Municipio, mes, kg)
+#
+# As consultas somam os dois; a planilha (dados.parquet) nunca é sobrescrita pelas ocorrências.
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import dados
+from dados import MESES
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # sem pyarrow não há série histórica: o app fica só no ano padrão
+    pa = None
+
+SERIE_DIR = Path("serie")
+SERIE_DIARIA_DIR = Path("serie_diaria")
+ARQ_PLANILHA = "dados.parquet"
+ARQ_OCORRENCIAS = "ocorrencias.parquet"
+
+
+def _particao(ano, droga, base=SERIE_DIR):
+    return Path(base) / f"ano={int(ano)}" / f"droga={droga}"
+
+
+def _dataset(base=SERIE_DIR):
+    esquema = pa.schema([("ano", pa.int16()), ("droga", pa.string())])
+    return ds.dataset(str(base), format="parquet", partitioning=ds.partitioning(esquema, flavor="hive"))
+
+
+# ------------------------------
+# Escrita
+# ------------------------------
+def larga_para_longa(df):
+    """Planilha Municipio × (Jan..Dez) -> linhas (Municipio, mes, kg)."""
+    meses = dados.colunas_mensais(df)
+    valores = df[meses].to_numpy(np.float64)
+    return pd.DataFrame({
+        "Municipio": np.repeat(df["Municipio"].astype(str).to_numpy(), len(meses)),
+        "mes": np.tile(np.asarray([MESES.index(m) + 1 for m in meses], dtype=np.int8), len(df)),
+        "kg": valores.ravel(),
+    })
+
+
+def _gravar_tabela(tabela, destino):
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    pq.write_table(tabela, tmp)
+    os.replace(tmp, destino)
+    return destino
+
+
+def _gravar_atomico(longo, destino, meta=None):
+    tabela = pa.Table.from_pandas(longo, preserve_index=False)
+    if meta:
+        tabela = tabela.replace_schema_metadata({**tabela.schema.metadata, **meta})
+    return _gravar_tabela(tabela, destino)
+
+
+def _metadados_fonte(arquivo):
+    # mesma identificação da fonte que o cache colunar (dados.compilar_cache) guarda
+    st = os.stat(arquivo)
+    return {"fonte_sha256": dados.hash_arquivo(arquivo), "fonte_mtime_ns": str(st.st_mtime_ns),
+            "fonte_tamanho": str(st.st_size)}
+
+
+def gravar_particao(df, ano, droga, base=SERIE_DIR, fonte=None):
+    """Grava (ou substitui de forma atômica) a partição de um ano/droga.
+
+    Com `fonte` (o CSV de origem), guarda hash/mtime/tamanho dele nos metadados da partição.
+    """
+    longo = larga_para_longa(df)
+    longo["Municipio"] = longo["Municipio"].astype("category")
+    meta = _metadados_fonte(fonte) if fonte is not None else None
+    return _gravar_atomico(longo, _particao(ano, droga, base) / ARQ_PLANILHA, meta)
+
+
+def _desatualizada(particao, arquivo):
+    """True se a partição não corresponde ao CSV atual (mtime/tamanho ou, se mudou, hash)."""
+    try:
+        esquema = pq.read_schema(particao)
+    except (OSError, pa.ArrowInvalid):
+        return True
+    meta = {k.decode(): v.decode() for k, v in (esquema.metadata or {}).items()}
+    # formato antigo (kg em float32) ou gravada sem a identificação da fonte
+    if esquema.field("kg").type != pa.float64() or "fonte_sha256" not in meta:
+        return True
+    st = os.stat(arquivo)
+    if meta.get("fonte_mtime_ns") == str(st.st_mtime_ns) and meta.get("fonte_tamanho") == str(st.st_size):
+        return False
+    # arquivo tocado (cópia com cp -p, mv, rsync -t...): decide pelo conteúdo, não pela data
+    if meta.get("fonte_sha256") != dados.hash_arquivo(arquivo):
+        return True
+    # mesmo conteúdo: guarda o mtime novo para as próximas verificações não refazerem o hash
+    try:
+        tabela = pq.read_table(particao)
+        meta.update(fonte_mtime_ns=str(st.st_mtime_ns), fonte_tamanho=str(st.st_size))
+        _gravar_tabela(tabela.replace_schema_metadata(meta), particao)
+    except OSError:
+        pass  # sem permissão de escrita: continua válida, só refaz o hash na próxima
+    return False
+
+
+def importar_planilhas(ano, arquivos=dados.DATA_FILES, base=SERIE_DIR, forcar=False):
+    """Importa as planilhas V2 de um ano para a série (só partições ausentes ou de outro conteúdo de CSV)."""
+    feitas = []
+    for droga, arquivo in arquivos.items():
+        particao = _particao(ano, droga, base) / ARQ_PLANILHA
+        if not Path(arquivo).exists():
+            continue
+        if forcar or _desatualizada(particao, arquivo):
+            gravar_particao(dados.carregar(arquivo), ano, droga, base, fonte=arquivo)
+            feitas.append(droga)
+    return feitas
+
+
+# ------------------------------
+# Base diária (ocorrências)
+# ------------------------------
+def gravar_lote_diario(df, ano, droga, lote, base=SERIE_DIARIA_DIR):
+    """Acrescenta um lote (Municipio, dia, kg) à base diária; o mesmo lote regravado só se substitui."""
+    longo = pd.DataFrame({
+        "Municipio": df["Municipio"].astype(str).astype("category"),
+        "dia": pd.to_datetime(df["dia"]).dt.date,
+        "kg": df["kg"].to_numpy(np.float64),
+    })
+    return _gravar_atomico(longo, _particao(ano, droga, base) / f"{lote}.parquet")
+
+
+def ler_diario(anos=None, drogas=None, municipios=None, base=SERIE_DIARIA_DIR):
+    """Linhas (ano, droga, Municipio, dia, kg) da base diária, com poda por ano/droga."""
+    if not Path(base).exists():
+        return pd.DataFrame({"ano": [], "droga": [], "Municipio": [], "dia": [], "kg": []})
+    filtro = None
+    for cond in (
+        ds.field("ano").isin([int(a) for a in anos]) if anos is not None else None,
+        ds.field("droga").isin(list(drogas)) if drogas is not None else None,
+        ds.field("Municipio").isin(list(municipios)) if municipios is not None else None,
+    ):
+        if cond is not None:
+            filtro = cond if filtro is None else filtro & cond
+    return _dataset(base).to_table(filter=filtro).to_pandas()
+
+
+def consolidar_mensal(ano, droga, base_diaria=SERIE_DIARIA_DIR, base=SERIE_DIR):
+    """Refaz o mensal das ocorrências de um ano/droga (ocorrencias.parquet), somando a base diária.
+
+    Fica ao lado da partição da planilha, sem tocá-la: as leituras somam as duas fontes.
+    """
+    diario = ler_diario([ano], [droga], base=base_diaria)
+    destino = _particao(ano, droga, base) / ARQ_OCORRENCIAS
+    if diario.empty:
+        # nenhum lote restante (descartados por uma reingestão completa): some o mensal
+        destino.unlink(missing_ok=True)
+        return destino
+    mensal = (diario.assign(mes=pd.to_datetime(diario["dia"]).dt.month.astype(np.int8),
+                            kg=diario["kg"].astype(np.float64))
+              .groupby(["Municipio", "mes"], observed=True, as_index=False)["kg"].sum())
+    # grade completa município × mês, como nas partições vindas das planilhas
+    grade = pd.MultiIndex.from_product(
+        [pd.unique(mensal["Municipio"].astype(str)), np.arange(1, 13, dtype=np.int8)], names=["Municipio", "mes"]
+    )
+    mensal["Municipio"] = mensal["Municipio"].astype(str)
+    mensal = mensal.set_index(["Municipio", "mes"]).reindex(grade, fill_value=0).reset_index()
+    mensal["Municipio"] = mensal["Municipio"].astype("category")
+    mensal["kg"] = mensal["kg"].round(3)
+    return _gravar_atomico(mensal, destino)
+
+
+def particoes_diarias(base=SERIE_DIARIA_DIR):
+    """Diretórios da base diária por (ano, droga), para o vigia acompanhar lotes novos."""
+    particoes = {}
+    for p in Path(base).glob("ano=*/droga=*"):
+        if p.is_dir():
+            particoes[(int(p.parent.name.split("=", 1)[1]), p.name.split("=", 1)[1])] = p
+    return particoes
+
+
+# ------------------------------
+# Leitura
+# ------------------------------
+def anos_disponiveis(base=SERIE_DIR):
+    anos = {int(p.name.split("=", 1)[1]) for p in Path(base).glob("ano=*") if p.is_dir()}
+    return sorted(anos, reverse=True)
+
+
+def ler(anos=None, drogas=None, municipios=None, meses=None, base=SERIE_DIR):
+    """Linhas (ano, droga, Municipio, mes, kg) filtradas; partições fora do filtro nem são abertas."""
+    filtro = None
+
+    def e(cond):
+        nonlocal filtro
+        filtro = cond if filtro is None else filtro & cond
+
+    if anos is not None:
+        e(ds.field("ano").isin([int(a) for a in anos]))
+    if drogas is not None:
+        e(ds.field("droga").isin(list(drogas)))
+    if municipios is not None:
+        e(ds.field("Municipio").isin(list(municipios)))
+    if meses is not None:
+        e(ds.field("mes").isin([MESES.index(m) + 1 for m in meses]))
+    return _dataset(base).to_table(filter=filtro).to_pandas()
+
+
+def planilhas_ano(ano, base=SERIE_DIR):
+    """Reconstrói, para um ano, as planilhas largas (Municipio, Jan..Dez, Total) de cada droga."""
+    longo = ler(anos=[ano], base=base)
+    planilhas = {}
+    for droga, parte in longo.groupby("droga", observed=True, sort=False):
+        larga = parte.pivot_table(index="Municipio", columns="mes", values="kg",
+                                  aggfunc="sum", fill_value=0, observed=True, sort=False)
+        larga = larga.reindex(columns=range(1, 13), fill_value=0)
+        larga.columns = MESES
+        larga = larga.astype(np.float64)
+        larga["Total"] = larga.sum(axis=1)
+        planilhas[str(droga)] = larga.reset_index()
+    return planilhas
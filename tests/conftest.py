@@ -0,0 +1,41 @@
+# conftest.py
+# Os módulos do projeto ficam na raiz do repositório (sem pacote).
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dados import MESES  # noqa: E402
+
+MUNICIPIOS = ["CURITIBA", "CASCAVEL", "FOZ DO IGUACU", "LONDRINA", "MARINGA"]
+
+
+def planilha(semente, municipios=MUNICIPIOS):
+    """Planilha V2 sintética (Municipio, Jan..Dez, Total) com kg em gramas exatos."""
+    rng = np.random.default_rng(semente)
+    meses = np.round(rng.uniform(0, 5000, (len(municipios), len(MESES))), 3)
+    df = pd.DataFrame(meses, columns=MESES)
+    df.insert(0, "Municipio", municipios)
+    df["Total"] = df[MESES].sum(axis=1).round(3)
+    return df
+
+
+@pytest.fixture
+def planilhas():
+    return {"Maconha": planilha(1), "Cocaína": planilha(2), "Crack": planilha(3, MUNICIPIOS[::-1][:3])}
+
+
+@pytest.fixture
+def base_serie(tmp_path, planilhas):
+    """Série histórica de 2024 em tmp_path, gravada a partir das planilhas sintéticas."""
+    serie = pytest.importorskip("serie")
+    if serie.pa is None:
+        pytest.skip("série histórica requer pyarrow")
+    base = tmp_path / "serie"
+    for droga, df in planilhas.items():
+        serie.gravar_particao(df, 2024, droga, base)
+    return base
@@ -0,0 +1,93 @@
+import inspect
+import io
+import os
+
+import numpy as np
+import pytest
+
+from conftest import planilha
+from dados import DATA_FILES
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def cliente(tmp_path_factory):
+    """API sobre três planilhas sintéticas num diretório de trabalho temporário."""
+    pasta = tmp_path_factory.mktemp("api")
+    anterior = os.getcwd()
+    os.chdir(pasta)
+    for i, arquivo in enumerate(DATA_FILES.values()):
+        planilha(i + 1).to_csv(arquivo, index=False)
+    api.planilhas.invalidar()
+    api.motores.invalidar()
+    try:
+        with TestClient(api.app) as cliente:
+            yield cliente
+    finally:
+        api.planilhas.invalidar()
+        api.motores.invalidar()
+        os.chdir(anterior)
+
+
+def test_anos_e_drogas(cliente):
+    assert cliente.get("/anos").json() == {"anos": [2024]}
+    corpo = cliente.get("/2024/drogas").json()
+    assert corpo["drogas"] == list(DATA_FILES)
+    assert corpo["meses"][0] == "Jan" and "CURITIBA" in corpo["municipios"]
+
+
+def test_ranking(cliente):
+    origem = planilha(1).sort_values("Total", ascending=False).head(3)
+    corpo = cliente.get("/2024/Maconha/ranking", params={"n": 3}).json()
+    assert [r["Municipio"] for r in corpo] == origem["Municipio"].tolist()
+    np.testing.assert_allclose([r["Total"] for r in corpo], origem["Total"])
+
+
+def test_tabela_filtrada(cliente):
+    corpo = cliente.get("/2024/Crack/tabela", params={"municipio": "CURITIBA", "mes": ["Jan", "Fev"]}).json()
+    origem = planilha(3).set_index("Municipio").loc["CURITIBA"]
+    assert len(corpo) == 1
+    assert corpo[0]["Jan"] == pytest.approx(origem["Jan"])
+    assert set(corpo[0]) == {"Municipio", "Jan", "Fev", "Total"}
+    assert corpo[0]["Total"] == pytest.approx(origem["Total"])  # total anual, como na planilha
+
+
+def test_estadual_em_arrow(cliente):
+    pa = pytest.importorskip("pyarrow")
+    resposta = cliente.get("/2024/Cocaína/estadual", params={"mes": ["Mar"]},
+                           headers={"accept": api.MIDIA_ARROW})
+    assert resposta.headers["content-type"] == api.MIDIA_ARROW
+    df = pa.ipc.open_stream(io.BytesIO(resposta.content)).read_all().to_pandas()
+    assert df["Mes"].tolist() == ["Mar"]
+    assert df["Total"].iloc[0] == pytest.approx(planilha(2)["Mar"].sum())
+
+
+@pytest.mark.parametrize("url,status", [
+    ("/1999/drogas", 404),
+    ("/2024/Heroína/ranking", 404),
+    ("/2024/Maconha/tabela?mes=Janeiro", 422),
+    ("/2024/Maconha/ranking?n=0", 422),
+    ("/2024/Maconha/ranking?por_habitantes=true", 422),
+    ("/2024/Maconha/ranking?n=dez", 422),
+])
+def test_erros(cliente, url, status):
+    resposta = cliente.get(url)
+    assert resposta.status_code == status
+    assert "detail" in resposta.json()
+
+
+def test_metricas_por_rota(cliente):
+    cliente.get("/2024/Maconha/ranking")
+    texto = cliente.get("/metrics").text
+    assert 'rota="/{ano}/{droga}/ranking"' in texto
+
+
+def test_consultas_fora_do_event_loop():
+    # rotas de consulta síncronas: o FastAPI as despacha no pool de threads
+    for rota in (api.drogas, api.tabela, api.selecao, api.evolucao, api.ranking, api.estadual):
+        assert not inspect.iscoroutinefunction(rota)
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import figuras
+import serie
+from cubo import Cubo, CuboDiario, soma_movel
+from dados import DATA_FILES, MESES
+
+
+MESES_PARCIAIS = ["Fev", "Mar", "Jul"]
+
+
+@pytest.mark.parametrize("municipios,meses", [(None, None), (["LONDRINA", "CURITIBA"], MESES_PARCIAIS)])
+def test_consultas_iguais_ao_pandas(planilhas, municipios, meses):
+    cubo = Cubo(planilhas, ano=2024)
+    df = planilhas["Cocaína"].set_index("Municipio")
+    sel = df.loc[municipios or df.index, meses or MESES]
+    # a ordem dos municípios é a da planilha, não a do filtro
+    sel = sel.loc[[m for m in df.index if m in sel.index]]
+    np.testing.assert_allclose(cubo.totais("Cocaína", municipios, meses), sel.sum(axis=1))
+    np.testing.assert_allclose(cubo.serie("Cocaína", municipios, meses), sel.to_numpy())
+    np.testing.assert_allclose(cubo.estadual_por_mes("Cocaína", meses), df[meses or MESES].sum())
+    longo = cubo.longo("Cocaína", municipios, meses)
+    assert list(longo.columns) == ["Municipio", "Mes", "Kg"] and len(longo) == sel.size
+
+
+def test_ranking_igual_ao_sort(planilhas):
+    cubo = Cubo(planilhas, ano=2024)
+    nomes, totais = cubo.ranking("Maconha", 3, MESES_PARCIAIS)
+    esperado = planilhas["Maconha"].set_index("Municipio")[MESES_PARCIAIS].sum(axis=1).nlargest(3)
+    assert list(nomes) == esperado.index.tolist()
+    np.testing.assert_allclose(totais, esperado.to_numpy())
+
+
+def test_totais_ao_grama(planilhas):
+    cubo = Cubo(planilhas, ano=2024)
+    tabela = cubo.tabela("Maconha")
+    np.testing.assert_array_equal(tabela["Total"].round(3), planilhas["Maconha"]["Total"])
+
+
+# ------------------------------
+# Paridade com o motor DuckDB
+# ------------------------------
+SELECOES = [(None, None), (["CURITIBA", "LONDRINA"], None), (None, MESES_PARCIAIS), (["MARINGA"], MESES_PARCIAIS)]
+
+
+@pytest.fixture
+def motores(base_serie):
+    duckdb_motor = pytest.importorskip("motor_duckdb")
+    pytest.importorskip("duckdb")
+    planilhas = serie.planilhas_ano(2024, base=base_serie)
+    # mesma ordem de drogas do montar_cubo (a do DATA_FILES)
+    cubo = Cubo({d: planilhas[d] for d in DATA_FILES if d in planilhas}, ano=2024)
+    return cubo, duckdb_motor.MotorDuckDB(2024, base=base_serie)
+
+
+def test_dimensoes_iguais(motores):
+    cubo, duck = motores
+    assert cubo.drogas == duck.drogas
+    assert cubo.meses == duck.meses
+    assert list(cubo.municipios) == list(duck.municipios)
+
+
+@pytest.mark.parametrize("municipios,meses", SELECOES)
+def test_paridade_consultas(motores, municipios, meses):
+    cubo, duck = motores
+    for droga in cubo.drogas:
+        pd.testing.assert_frame_equal(
+            cubo.tabela(droga, municipios, meses).reset_index(drop=True),
+            duck.tabela(droga, municipios, meses).reset_index(drop=True),
+            check_dtype=False,
+        )
+        pd.testing.assert_frame_equal(
+            cubo.longo(droga, municipios, meses).reset_index(drop=True),
+            duck.longo(droga, municipios, meses).reset_index(drop=True),
+            check_dtype=False,
+        )
+        np.testing.assert_allclose(cubo.totais(droga, municipios, meses), duck.totais(droga, municipios, meses))
+        np.testing.assert_allclose(cubo.estadual_por_mes(droga, meses), duck.estadual_por_mes(droga, meses))
+
+
+@pytest.mark.parametrize("meses", [None, MESES_PARCIAIS])
+def test_paridade_ranking(motores, meses):
+    cubo, duck = motores
+    for droga in cubo.drogas:
+        nomes_c, totais_c = cubo.ranking(droga, 3, meses)
+        nomes_d, totais_d = duck.ranking(droga, 3, meses)
+        assert list(nomes_c) == list(nomes_d)
+        np.testing.assert_allclose(totais_c, totais_d)
+
+
+def test_paridade_com_ocorrencias(tmp_path, base_serie):
+    duckdb_motor = pytest.importorskip("motor_duckdb")
+    pytest.importorskip("duckdb")
+    lote = pd.DataFrame({"Municipio": ["CURITIBA", "PALMAS"], "dia": pd.to_datetime(["2024-03-05", "2024-07-01"]),
+                         "kg": [1.5, 2.0]})
+    serie.gravar_lote_diario(lote, 2024, "Crack", "l1", tmp_path / "diaria")
+    serie.consolidar_mensal(2024, "Crack", tmp_path / "diaria", base_serie)
+    planilhas = serie.planilhas_ano(2024, base=base_serie)
+    cubo = Cubo({d: planilhas[d] for d in DATA_FILES if d in planilhas}, ano=2024)
+    duck = duckdb_motor.MotorDuckDB(2024, base=base_serie)
+    assert "PALMAS" in list(duck.municipios)
+    pd.testing.assert_frame_equal(cubo.tabela("Crack").reset_index(drop=True),
+                                  duck.tabela("Crack").reset_index(drop=True), check_dtype=False)
+    np.testing.assert_allclose(duck.totais("Crack", ["CURITIBA"], ["Mar"]), cubo.totais("Crack", ["CURITIBA"], ["Mar"]))
+
+
+# ------------------------------
+# Base diária
+# ------------------------------
+@pytest.fixture
+def diario():
+    dias = pd.date_range("2024-01-01", "2024-12-31", freq="D")
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "droga": "Crack",
+        "Municipio": np.where(np.arange(len(dias)) % 2, "CURITIBA", "LONDRINA"),
+        "dia": dias,
+        "kg": np.round(rng.uniform(0, 10, len(dias)), 3),
+    })
+    return CuboDiario(df, 2024, ["CURITIBA", "LONDRINA"]), df
+
+
+def test_diario_granularidades(diario):
+    cubo, df = diario
+    for granularidade in ("dia", "semana", "mes"):
+        nomes, eixo, matriz = cubo.serie("Crack", granularidade=granularidade)
+        assert list(nomes) == ["CURITIBA", "LONDRINA"]
+        assert matriz.shape == (2, len(eixo))
+        np.testing.assert_allclose(matriz.sum(), df["kg"].sum())
+    _, eixo, matriz = cubo.serie("Crack", granularidade="mes", meses=["Jan", "Mar"])
+    assert list(pd.DatetimeIndex(eixo).month) == [1, 3]
+    esperado = df[df["dia"].dt.month.isin([1, 3])].groupby([df["Municipio"], df["dia"].dt.month])["kg"].sum()
+    np.testing.assert_allclose(matriz[0], esperado["CURITIBA"].to_numpy())
+
+
+@pytest.mark.parametrize("granularidade,janela", [("dia", 7), ("semana", 4), ("mes", 3)])
+def test_diario_janela_em_pontos_da_granularidade(diario, granularidade, janela):
+    cubo, _ = diario
+    _, _, base = cubo.serie("Crack", granularidade=granularidade)
+    _, _, movel = cubo.serie("Crack", granularidade=granularidade, janela=janela)
+    for t in range(base.shape[1]):
+        np.testing.assert_allclose(movel[:, t], base[:, max(0, t + 1 - janela):t + 1].sum(axis=1))
+
+
+@pytest.mark.parametrize("granularidade,janela", [("hora", None), ("dia", 2.5), ("dia", -1)])
+def test_diario_parametros_invalidos(diario, granularidade, janela):
+    cubo, _ = diario
+    with pytest.raises(ValueError):
+        cubo.serie("Crack", granularidade=granularidade, janela=janela)
+
+
+@pytest.mark.parametrize("janela", [None, 3])
+def test_evolucao_mensal_sempre_do_cubo(planilhas, diario, janela):
+    # a base diária só tem ocorrências de Crack: a visão mensal, com ou sem janela, é a das planilhas
+    cubo = Cubo(planilhas, ano=2024)
+    cubo.diario = diario[0]
+    fig = figuras.figura_evolucao(cubo, "Maconha", ["CURITIBA"], None, "linhas", "mes", janela)
+    mensal = planilhas["Maconha"].set_index("Municipio").loc[["CURITIBA"], MESES].to_numpy()
+    esperado = soma_movel(mensal, janela)[0] if janela else mensal[0]
+    np.testing.assert_allclose(np.asarray(fig.data[0].y, dtype=float), esperado)
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+import dados
+
+pa = pytest.importorskip("pyarrow")
+
+CSV = """Municipio,Jan,Fev,Total
+CASCAVEL,3552.182,33330.131,36882.313
+FOZ DO IGUACU,44262.616,0.0,44262.616
+,1.0,1.0,2.0
+"""
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "MaconhaV2.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return path
+
+
+def test_valores_ao_grama(csv):
+    df = dados.carregar(csv)
+    assert list(df["Municipio"]) == ["CASCAVEL", "FOZ DO IGUACU"]
+    assert df["Total"].tolist() == [36882.313, 44262.616]
+    assert round(df.loc[0, "Jan"] + df.loc[0, "Fev"], 3) == 36882.313
+
+
+def test_hash_igual_grava_mtime_novo(csv):
+    dados.carregar(csv)
+    destino = dados.caminho_cache(csv)
+    st = csv.stat()
+    os.utime(csv, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    assert dados.cache_valido(csv)
+    meta = dados._metadados_cache(destino)
+    assert meta["fonte_mtime_ns"] == str(csv.stat().st_mtime_ns)
+
+
+def test_conteudo_novo_invalida(csv):
+    dados.carregar(csv)
+    csv.write_text(CSV.replace("3552.182", "3552.183"), encoding="utf-8")
+    assert not dados.cache_valido(csv)
+    assert dados.carregar(csv).loc[0, "Jan"] == 3552.183
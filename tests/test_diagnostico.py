@@ -0,0 +1,74 @@
+import json
+import logging
+
+import pytest
+
+import diagnostico
+from diagnostico import LIMITES_S, Metricas
+
+
+def linhas(texto, prefixo):
+    return {l.rsplit(" ", 1)[0]: float(l.rsplit(" ", 1)[1]) for l in texto.splitlines() if l.startswith(prefixo)}
+
+
+def test_histograma_cumulativo():
+    met = Metricas()
+    for segundos in (0.003, 0.04, 0.04, 7.0):
+        met.registrar("mapa", segundos)
+    texto = met.prometheus()
+    assert "# TYPE drogaspr_secao_segundos histogram" in texto
+    buckets = linhas(texto, "drogaspr_secao_segundos_bucket")
+    assert buckets['drogaspr_secao_segundos_bucket{secao="mapa",le="0.005"}'] == 1
+    assert buckets['drogaspr_secao_segundos_bucket{secao="mapa",le="0.05"}'] == 3
+    assert buckets['drogaspr_secao_segundos_bucket{secao="mapa",le="5.0"}'] == 3
+    assert buckets['drogaspr_secao_segundos_bucket{secao="mapa",le="+Inf"}'] == 4
+    assert len(buckets) == len(LIMITES_S) + 1
+    # os buckets nunca diminuem com o limite
+    valores = list(buckets.values())
+    assert valores == sorted(valores)
+    assert linhas(texto, "drogaspr_secao_segundos_sum")['drogaspr_secao_segundos_sum{secao="mapa"}'] == \
+        pytest.approx(7.083)
+    assert linhas(texto, "drogaspr_secao_segundos_count")['drogaspr_secao_segundos_count{secao="mapa"}'] == 4
+
+
+def test_contadores_e_medidas_com_rotulos():
+    met = Metricas(prefixo="app")
+    met.contar("requisicoes_total", rota="/anos", status=200)
+    met.contar("requisicoes_total", status=200, rota="/anos")  # ordem dos rótulos não importa
+    met.contar("requisicoes_total", rota="/anos", status=404)
+    met.definir("resposta_bytes", 10, rota="/anos")
+    met.definir("resposta_bytes", 12, rota="/anos")
+    texto = met.prometheus()
+    assert texto.count("# TYPE app_requisicoes_total counter") == 1
+    assert 'app_requisicoes_total{rota="/anos",status="200"} 2' in texto
+    assert 'app_requisicoes_total{rota="/anos",status="404"} 1' in texto
+    assert "# TYPE app_resposta_bytes gauge" in texto
+    assert 'app_resposta_bytes{rota="/anos"} 12' in texto
+    assert met.valor("requisicoes_total", rota="/anos", status=200) == 2
+    assert texto.endswith("\n")
+
+
+def test_medir_conta_erro_e_propaga():
+    met = Metricas()
+    with met.medir("cubo"):
+        pass
+    with pytest.raises(KeyError):
+        with met.medir("cubo"):
+            raise KeyError("Crack")
+    (resumo,) = met.secoes()
+    assert resumo["secao"] == "cubo" and resumo["n"] == 2 and resumo["erros"] == 1
+    assert resumo["max_ms"] >= resumo["media_ms"] >= 0
+
+
+def test_log_json(tmp_path, monkeypatch):
+    destino = tmp_path / "diag.jsonl"
+    monkeypatch.setattr(diagnostico, "log", logging.getLogger("diagnostico.teste"))
+    diagnostico.configurar_log(str(destino))
+    try:
+        Metricas().registrar("ranking", 0.0125, droga="Crack")
+    finally:
+        for handler in diagnostico.log.handlers:
+            handler.close()
+        diagnostico.log.handlers.clear()
+    evento = json.loads(destino.read_text(encoding="utf-8"))
+    assert evento["secao"] == "ranking" and evento["ms"] == 12.5 and evento["droga"] == "Crack"
@@ -0,0 +1,96 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import exportacao
+from cubo import Cubo
+from dados import MESES
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    exportacao.invalidar(2024)
+    yield
+    exportacao.invalidar(2024)
+
+
+@pytest.fixture
+def cubo():
+    # valores que em float32 (ou somados em ponto flutuante) não fecham no grama
+    df = pd.DataFrame({"Municipio": ["CASCAVEL", "FOZ DO IGUACU"]})
+    for i, mes in enumerate(MESES):
+        df[mes] = [3552.182 + i * 0.1, 44262.617 / 12 + i]
+    df["Total"] = df[MESES].sum(axis=1)
+    return Cubo({"Maconha": df, "Crack": df.assign(**{m: df[m] / 3 for m in MESES})}, ano=2024)
+
+
+def test_csv_arredondado_ao_grama(cubo):
+    texto = exportacao.exportar(cubo, ("Maconha",), ("CASCAVEL",), tuple(MESES), "CSV").decode()
+    lido = pd.read_csv(io.StringIO(texto))
+    assert "3552.182," in texto
+    for valor in lido.select_dtypes("number").to_numpy().ravel():
+        assert valor == round(valor, exportacao.CASAS_EXPORTACAO)
+        assert len(repr(float(valor)).split(".")[-1]) <= exportacao.CASAS_EXPORTACAO
+
+
+def test_todas_as_drogas_com_coluna_droga(cubo):
+    df = exportacao.tabela_exportacao(cubo, ["Maconha", "Crack"], None, None)
+    assert list(df.columns[:2]) == ["Droga", "Municipio"]
+    np.testing.assert_array_equal(df["Total"], df["Total"].round(3))
+
+
+@pytest.mark.parametrize("formato", ["Parquet", "Arrow IPC"])
+def test_formatos_binarios_arredondados(cubo, formato):
+    pa = pytest.importorskip("pyarrow")
+    dados = exportacao.exportar(cubo, ("Crack",), ("CASCAVEL",), tuple(MESES), formato)
+    if formato == "Parquet":
+        import pyarrow.parquet as pq
+
+        df = pq.read_table(pa.BufferReader(dados)).to_pandas()
+    else:
+        df = pa.ipc.open_file(pa.BufferReader(dados)).read_all().to_pandas()
+    np.testing.assert_array_equal(df["Jan"], df["Jan"].round(3))
+
+
+def test_csv_gzip_igual_ao_csv(cubo):
+    import gzip
+
+    csv = exportacao.exportar(cubo, ("Crack",), ("CASCAVEL",), ("Jan", "Fev"), "CSV")
+    gz = exportacao.exportar(cubo, ("Crack",), ("CASCAVEL",), ("Jan", "Fev"), "CSV (gzip)")
+    assert gzip.decompress(gz) == csv
+
+
+def test_formato_desconhecido(cubo):
+    with pytest.raises(ValueError, match="desconhecido"):
+        exportacao.exportar(cubo, ("Crack",), ("CASCAVEL",), ("Jan",), "XLSX")
+
+
+def test_lru_limitado(cubo, monkeypatch):
+    monkeypatch.setattr(exportacao, "LIMITE_EXPORTACOES", 2)
+    for mes in ("Jan", "Fev", "Mar"):
+        exportacao.exportar(cubo, ("Crack",), ("CASCAVEL",), (mes,), "CSV")
+    assert [c[3] for c in exportacao._exportacoes] == [("Fev",), ("Mar",)]
+
+
+def test_nome_arquivo():
+    assert exportacao.nome_arquivo(("Crack",), "CSV (gzip)") == "apreensao_crack_filtrada.csv.gz"
+    assert exportacao.nome_arquivo(("Crack", "Maconha"), "Parquet").startswith("apreensao_todas_filtrada.")
+
+
+def test_invalidar_so_a_droga(cubo):
+    maconha = exportacao.exportar(cubo, ("Maconha",), ("CASCAVEL",), ("Jan",), "CSV")
+    crack = exportacao.exportar(cubo, ("Crack",), ("CASCAVEL",), ("Jan",), "CSV")
+    exportacao.invalidar(2024, "Maconha")
+    chaves = list(exportacao._exportacoes)
+    assert [c[1] for c in chaves] == [("Crack",)]
+    assert exportacao.exportar(cubo, ("Crack",), ("CASCAVEL",), ("Jan",), "CSV") is crack
+    assert exportacao.exportar(cubo, ("Maconha",), ("CASCAVEL",), ("Jan",), "CSV") == maconha
+
+
+def test_geracao_na_chave(cubo):
+    antes = exportacao.exportar(cubo, ("Maconha",), ("CASCAVEL",), ("Jan",), "CSV")
+    cubo.geracoes = {"Maconha": 1}
+    depois = exportacao.exportar(cubo, ("Maconha",), ("CASCAVEL",), ("Jan",), "CSV")
+    assert depois == antes and depois is not antes  # gerado de novo, não servido do cache
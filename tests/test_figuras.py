@@ -0,0 +1,129 @@
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+import figuras
+from conftest import planilha
+from cubo import Cubo
+from dados import MESES
+from diagnostico import Metricas
+
+
+def fabrica(rotulo, construidas=None):
+    """Figura pequena (uma barra) identificada pelo rótulo; registra cada construção."""
+    def construir():
+        if construidas is not None:
+            construidas.append(rotulo)
+        return go.Figure(go.Bar(x=[rotulo], y=[1]))
+    return construir
+
+
+def tamanho(rotulo):
+    return len(fabrica(rotulo)().to_json())
+
+
+# ------------------------------
+# Cache de figuras
+# ------------------------------
+def test_acerto_nao_reconstroi():
+    cache, construidas = figuras.CacheFiguras(), []
+    chave = ("ranking", 2024, "Crack", 10)
+    primeira = cache.obter(chave, fabrica("a", construidas))
+    segunda = cache.obter(chave, fabrica("a", construidas))
+    assert construidas == ["a"]
+    assert (cache.acertos, cache.faltas) == (1, 1)
+    assert segunda.to_json() == primeira.to_json() and segunda is not primeira
+
+
+def test_lru_respeita_limite_de_bytes():
+    cache = figuras.CacheFiguras(limite_bytes=2 * tamanho("a") + tamanho("a") // 2)
+    for rotulo in ("a", "b"):
+        cache.obter(("s", 2024, rotulo), fabrica(rotulo))
+    cache.obter(("s", 2024, "a"), fabrica("a"))  # "a" volta a ser o mais recente
+    cache.obter(("s", 2024, "c"), fabrica("c"))
+    assert list(cache._itens) == [("s", 2024, "a"), ("s", 2024, "c")]
+    assert cache.despejos == 1
+    assert cache._bytes == sum(map(len, cache._itens.values())) <= cache.limite_bytes
+
+
+def test_figura_maior_que_o_limite_nao_entra():
+    cache, construidas = figuras.CacheFiguras(limite_bytes=10), []
+    cache.obter(("s", 2024, "a"), fabrica("a", construidas))
+    cache.obter(("s", 2024, "a"), fabrica("a", construidas))
+    assert construidas == ["a", "a"] and cache._bytes == 0
+
+
+def test_invalidar_droga_e_misturadas():
+    cache = figuras.CacheFiguras()
+    chaves = [("mapa", 2024, "Crack"), ("mapa", 2024, "Maconha"), ("comparativo", 2024, None),
+              ("mapa", 2023, "Crack")]
+    for chave in chaves:
+        cache.obter(chave, fabrica(str(chave)))
+    cache.invalidar(2024, "Crack")
+    assert list(cache._itens) == [("mapa", 2024, "Maconha"), ("mapa", 2023, "Crack")]
+    cache.invalidar(2024)
+    assert list(cache._itens) == [("mapa", 2023, "Crack")]
+    assert cache._bytes == len(cache._itens[("mapa", 2023, "Crack")])
+
+
+def test_metricas_por_secao():
+    met = Metricas()
+    cache = figuras.CacheFiguras(metricas=met)
+    cache.obter(("ranking", 2024, "Crack"), fabrica("a"))
+    cache.obter(("ranking", 2024, "Crack"), fabrica("a"))
+    texto = met.prometheus()
+    assert 'figuras_cache_total{resultado="acerto",secao="ranking"} 1' in texto
+    assert 'figuras_cache_total{resultado="falta",secao="ranking"} 1' in texto
+    assert 'secao="ranking.construir"' in texto
+
+
+# ------------------------------
+# Evolução com muitos municípios
+# ------------------------------
+@pytest.fixture
+def cubo_grande():
+    municipios = [f"MUNICIPIO {i:03d}" for i in range(40)]
+    return Cubo({"Crack": planilha(5, municipios), "Maconha": planilha(6, municipios)}, ano=2024), municipios
+
+
+@pytest.mark.parametrize("n,modo,traces", [
+    (figuras.LIMITE_LINHAS, "auto", figuras.LIMITE_LINHAS),      # uma linha por município
+    (figuras.LIMITE_LINHAS + 1, "auto", figuras.TOP_LINHAS + 1),  # top-K + "Outros"
+    (40, "top", figuras.TOP_LINHAS + 1),
+    (40, "webgl", 2),                                           # linhas + marcadores com os nomes
+    (40, "linhas", 40),
+])
+def test_quantidade_de_traces(cubo_grande, n, modo, traces):
+    cubo, municipios = cubo_grande
+    fig = figuras.figura_evolucao(cubo, "Crack", municipios[:n], None, modo)
+    assert len(fig.data) == traces
+
+
+def test_top_soma_o_resto_em_outros(cubo_grande):
+    cubo, municipios = cubo_grande
+    fig = figuras.figura_evolucao(cubo, "Crack", municipios, ["Jan", "Fev"], "top")
+    outros, *top = fig.data
+    assert outros.name == f"Outros ({40 - figuras.TOP_LINHAS} municípios)"
+    total = np.asarray(outros.y, float) + sum(np.asarray(t.y, float) for t in top)
+    np.testing.assert_allclose(total, cubo.estadual_por_mes("Crack", ["Jan", "Fev"]))
+
+
+def test_webgl_sem_texto_por_ponto(cubo_grande):
+    cubo, municipios = cubo_grande
+    fig = figuras.figura_evolucao(cubo, "Crack", municipios, None, "webgl")
+    linhas, marcadores = fig.data
+    assert linhas.type == "scattergl" and linhas.hovertext is None and linhas.text is None
+    posicao = np.asarray(linhas.customdata).reshape(40, 13)
+    assert (posicao == posicao[:, :1]).all() and sorted(posicao[:, 0]) == list(range(1, 41))
+    assert len(marcadores.hovertext) == 40
+    assert np.isnan(np.asarray(linhas.y, float)).sum() == 40  # um NaN separando cada linha
+
+
+@pytest.mark.parametrize("modo,por_painel", [("auto", figuras.TOP_LINHAS + 1), ("webgl", 2)])
+def test_comparativo_um_painel_por_droga(cubo_grande, modo, por_painel):
+    cubo, municipios = cubo_grande
+    df_comp = cubo.comparativo(municipios, None)
+    fig = figuras.figura_comparativo_evolucao(df_comp, cubo.drogas, MESES, modo)
+    assert len(fig.data) == por_painel * len(cubo.drogas)
+    na_legenda = [t.name for t in fig.data if t.showlegend is not False]
+    assert len(na_legenda) == len(set(na_legenda))
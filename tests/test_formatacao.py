@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from formatacao import formatar_numeros, formatar_tabela
+
+
+def referencia(valor, casas):
+    """Formatação célula a célula do Python, trocando os separadores para pt-BR."""
+    return f"{valor:,.{casas}f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+@pytest.mark.parametrize("valores,casas,esperado", [
+    ([1234567.891, 12404.718, 0.007], 3, ["1.234.567,891", "12.404,718", "0,007"]),
+    ([1234567.891, 12404.718], 0, ["1.234.568", "12.405"]),
+    ([-1234.5, -0.4, -0.0004], 2, ["-1.234,50", "-0,40", "0,00"]),  # negativo que arredonda a zero sai sem sinal
+    ([np.nan, 0.0, 5], 1, ["", "0,0", "5,0"]),
+    ([999.9996, 999.4], 0, ["1.000", "999"]),
+    ([1e12, 123456789012.346], 2, ["1.000.000.000.000,00", "123.456.789.012,35"]),
+])
+def test_casos(valores, casas, esperado):
+    assert list(formatar_numeros(valores, casas)) == esperado
+
+
+@pytest.mark.parametrize("casas", [0, 2, 3])
+def test_igual_a_formatacao_do_python(casas):
+    rng = np.random.default_rng(casas)
+    # valores inteiros em milésimos longe de empates de arredondamento
+    valores = (rng.integers(-10**9, 10**9, 500) + 0.3) / 1000 * rng.choice([1, 1000], 500)
+    assert list(formatar_numeros(valores, casas)) == [referencia(v, casas) for v in valores]
+
+
+def test_vazio_e_so_nulos():
+    assert list(formatar_numeros([], 2)) == []
+    assert list(formatar_numeros([np.nan, np.nan])) == ["", ""]
+
+
+def test_tabela_so_colunas_numericas():
+    df = pd.DataFrame({"Municipio": ["CURITIBA"], "Jan": [1234.5], "Total": [np.nan]})
+    saida = formatar_tabela(df, 1)
+    assert saida.to_dict("records") == [{"Municipio": "CURITIBA", "Jan": "1.234,5", "Total": ""}]
+    assert df["Jan"].iloc[0] == 1234.5
@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+import geo
+
+
+def test_publicar_copia_e_versiona(tmp_path):
+    origem, destino = tmp_path / "municipios_pr.json", tmp_path / "static" / "municipios_pr.json"
+    origem.write_text(json.dumps({"type": "FeatureCollection", "features": []}), encoding="utf-8")
+    url = geo.publicar_municipios(origem, destino)
+    assert destino.read_bytes() == origem.read_bytes()
+    assert url == f"{geo.URL_ESTATICO}/municipios_pr.json?v={destino.stat().st_mtime_ns}"
+    # já publicada (build): não copia de novo
+    assert geo.publicar_municipios(origem, destino) == url
+
+
+def test_publicar_sem_malha(tmp_path):
+    with pytest.raises(geo.ArtefatoAusente, match="python geo.py"):
+        geo.publicar_municipios(tmp_path / "nao_existe.json", tmp_path / "static" / "x.json")
+
+
+# ------------------------------
+# Contorno da UF
+# ------------------------------
+QUADRADO = [[0, 0], [1, 0], [1, 1], [0, 0]]
+FURO = [[0.2, 0.2], [0.4, 0.2], [0.2, 0.4], [0.2, 0.2]]
+ILHA = [[5, 5], [6, 5], [5, 6], [5, 5]]
+
+
+def uf(geometria):
+    return {"type": "FeatureCollection", "features": [{"type": "Feature", "geometry": geometria}]}
+
+
+def test_contorno_poligono_com_furo():
+    linhas = geo.contorno_em_linhas(uf({"type": "Polygon", "coordinates": [QUADRADO, FURO]}))
+    assert linhas["lon"] == [0, 1, 1, 0, None, 0.2, 0.4, 0.2, 0.2]
+    assert linhas["lat"] == [0, 0, 1, 0, None, 0.2, 0.2, 0.4, 0.2]
+
+
+def test_contorno_multipoligono():
+    linhas = geo.contorno_em_linhas(uf({"type": "MultiPolygon", "coordinates": [[QUADRADO, FURO], [ILHA]]}))
+    assert linhas["lon"].count(None) == 2
+    assert len(linhas["lon"]) == len(linhas["lat"]) == 3 * 4 + 2
+    assert linhas["lon"][-4:] == [5, 6, 5, 5]
+
+
+def test_contorno_num_trace_so(tmp_path):
+    import figuras
+
+    linhas = geo.contorno_em_linhas(uf({"type": "MultiPolygon", "coordinates": [[QUADRADO], [ILHA]]}))
+    geo.gravar_linhas(linhas, tmp_path / "contorno.npy")
+    lidas = geo.carregar_contorno_linhas(tmp_path / "contorno.npy")
+    assert np.isnan(lidas["lon"][4]) and lidas["lon"].tolist()[5:] == [5, 6, 5, 5]
+    fig = figuras.adicionar_contorno_uf(go.Figure(), linhas=lidas)
+    assert len(fig.data) == 1 and fig.data[0].mode == "lines"
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import geo
+from conftest import planilha
+from cubo import Cubo
+from dados import MESES
+
+MUNICIPIOS = [f"MUNICIPIO {i:03d}" for i in range(200)]
+
+
+@pytest.fixture
+def grande():
+    df = planilha(11, MUNICIPIOS)
+    # empates exatos: a ordem de desempate é a da planilha
+    df.loc[[10, 50, 150], MESES] = df.loc[5, MESES].to_numpy()
+    df["Total"] = df[MESES].sum(axis=1)
+    return df
+
+
+def dimensao(municipios, populacao):
+    return pd.DataFrame({"codigo_ibge": 4100000 + np.arange(len(municipios)), "nome_ascii": municipios,
+                         "populacao": populacao})
+
+
+@pytest.mark.parametrize("meses", [None, ["Jan"], ["Fev", "Mar", "Jul", "Dez"], MESES[:11]])
+@pytest.mark.parametrize("n", [1, 10, 50, 500])
+def test_selecao_parcial_igual_ao_sort(grande, meses, n):
+    cubo = Cubo({"Crack": grande}, ano=2024)
+    nomes, totais = cubo.ranking("Crack", n, meses)
+    soma = grande[meses or MESES].sum(axis=1).to_numpy()
+    ordem = np.lexsort((np.arange(len(soma)), -soma))[:n]
+    assert list(nomes) == [MUNICIPIOS[i] for i in ordem]
+    np.testing.assert_allclose(totais, soma[ordem])
+
+
+def test_por_habitantes_ignora_populacao_ausente(grande):
+    populacao = np.random.default_rng(3).integers(1_000, 2_000_000, len(MUNICIPIOS)).astype(float)
+    populacao[[0, 7]] = np.nan
+    cubo = Cubo({"Crack": grande}, dimensao=dimensao(MUNICIPIOS, populacao), ano=2024)
+    nomes, taxas = cubo.ranking("Crack", len(MUNICIPIOS), ["Jan", "Fev"], por_habitantes=True)
+    assert len(nomes) == len(MUNICIPIOS) - 2
+    assert MUNICIPIOS[0] not in nomes and MUNICIPIOS[7] not in nomes
+    esperado = grande[["Jan", "Fev"]].sum(axis=1).to_numpy() / populacao * 100_000
+    assert taxas[0] == pytest.approx(np.nanmax(esperado))
+    assert np.all(np.diff(taxas) <= 0)
+
+
+def test_por_habitantes_sem_populacao(grande):
+    cubo = Cubo({"Crack": grande}, ano=2024)
+    assert cubo.populacao is None
+    with pytest.raises(ValueError, match="população"):
+        cubo.ranking("Crack", 10, por_habitantes=True)
+
+
+def test_populacao_incompleta_nao_entra_na_dimensao(tmp_path):
+    dim = dimensao(MUNICIPIOS[:3], [0, 0, 0]).drop(columns="populacao").assign(nome=MUNICIPIOS[:3], feature_id=range(3))
+    dim.to_csv(tmp_path / "dim.csv", index=False)
+    pop = pd.DataFrame({"codigo_ibge": dim["codigo_ibge"], "populacao": [10, 0, 30]})
+    pop.to_csv(tmp_path / "pop.csv", index=False)
+    assert geo.validar_populacao(dim, pop) == [4100001]
+    assert "populacao" not in geo.carregar_dimensao(tmp_path / "dim.csv", populacao=tmp_path / "pop.csv")
+    pop.assign(populacao=[10, 20, 30]).to_csv(tmp_path / "pop.csv", index=False)
+    completa = geo.carregar_dimensao(tmp_path / "dim.csv", populacao=tmp_path / "pop.csv")
+    assert completa["populacao"].tolist() == [10, 20, 30]
+
+
+# ------------------------------
+# Todas as drogas
+# ------------------------------
+@pytest.mark.parametrize("meses", [None, ["Mar", "Abr"]])
+def test_ranking_combinado(planilhas, meses):
+    cubo = Cubo(planilhas, ano=2024)
+    nomes, composicao = cubo.ranking_combinado(3, meses)
+    por_droga = pd.DataFrame({d: df.set_index("Municipio")[meses or MESES].sum(axis=1)
+                              for d, df in planilhas.items()}).fillna(0)
+    esperado = por_droga.sum(axis=1).sort_values(ascending=False, kind="stable").head(3)
+    assert list(nomes) == esperado.index.tolist()
+    assert composicao.shape == (len(cubo.drogas), 3)
+    np.testing.assert_allclose(composicao, por_droga.loc[esperado.index, cubo.drogas].to_numpy().T)
+    np.testing.assert_allclose(composicao.sum(axis=0), esperado.to_numpy())
+
+
+def test_ranking_combinado_generico_igual_ao_do_cubo(planilhas, base_serie):
+    motor_duckdb = pytest.importorskip("motor_duckdb")
+    pytest.importorskip("duckdb")
+    cubo = Cubo({d: planilhas[d] for d in ("Maconha", "Cocaína", "Crack")}, ano=2024)
+    duck = motor_duckdb.MotorDuckDB(2024, base=base_serie)
+    for n, meses in ((5, None), (2, ["Jan"])):
+        nomes_c, comp_c = cubo.ranking_combinado(n, meses)
+        nomes_d, comp_d = duck.ranking_combinado(n, meses)
+        assert list(nomes_c) == list(nomes_d)
+        np.testing.assert_allclose(comp_c, comp_d)
+
+
+def test_ranking_combinado_vazio():
+    cubo = Cubo({"Crack": planilha(1, ["CURITIBA"])}, ano=2024)
+    nomes, composicao = cubo.ranking_combinado(0)
+    assert len(nomes) == 0 and composicao.shape == (1, 0)
+    nomes, _ = cubo.ranking_combinado(10)
+    assert list(nomes) == ["CURITIBA"]
+
+
+def test_comparativo_numa_passada_igual_ao_generico(planilhas):
+    from cubo import Dimensoes
+
+    cubo = Cubo(planilhas, ano=2024)
+    filtros = (["CURITIBA", "LONDRINA"], ["Fev", "Jun"])
+    pd.testing.assert_frame_equal(cubo.comparativo(*filtros).reset_index(drop=True),
+                                  Dimensoes.comparativo(cubo, *filtros).reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
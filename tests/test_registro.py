@@ -0,0 +1,81 @@
+import copy
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from registro import DictSomenteLeitura, Registro, congelar
+
+
+# ------------------------------
+# Congelamento
+# ------------------------------
+def test_congelar_geojson():
+    gj = congelar({"type": "FeatureCollection", "features": [{"id": 1, "coordinates": [[0, 1], [2, 3]]}]})
+    assert isinstance(gj, DictSomenteLeitura)
+    assert isinstance(gj["features"], tuple) and isinstance(gj["features"][0]["coordinates"][0], tuple)
+    for alterar in (lambda: gj.__setitem__("x", 1), lambda: gj.update(x=1), lambda: gj.pop("type"),
+                    lambda: gj["features"][0].clear(), lambda: gj.setdefault("x", 1)):
+        with pytest.raises(TypeError):
+            alterar()
+    # cópia (pickle/deepcopy, como faz o Plotly) volta a ser um dict comum
+    assert type(copy.deepcopy(gj)) is dict and type(pickle.loads(pickle.dumps(gj))) is dict
+
+
+def test_congelar_arrays_e_dataframes():
+    arr = congelar(np.arange(3.0))
+    with pytest.raises(ValueError):
+        arr[0] = 1
+    df = congelar(pd.DataFrame({"Municipio": ["CURITIBA"], "Jan": [1.0]}))
+    with pytest.raises(ValueError):
+        df["Jan"].to_numpy()[0] = 2
+
+
+# ------------------------------
+# Registro
+# ------------------------------
+def test_carrega_uma_vez_e_serve_por_referencia():
+    reg, cargas = Registro(), []
+
+    def carregar():
+        cargas.append(1)
+        return {"a": [1, 2]}
+
+    primeiro, segundo = reg.obter("k", carregar), reg.obter("k", carregar)
+    assert primeiro is segundo and len(cargas) == 1
+    info = reg.estatisticas()
+    assert info["itens"] == 1 and info["acertos"] == 1 and info["bytes"] > 0
+
+
+def test_dataframe_servido_isolado_entre_sessoes():
+    reg = Registro()
+    carregar = lambda: pd.DataFrame({"Jan": [1.0, 2.0]})  # noqa: E731
+    sessao = reg.obter("df", carregar)
+    sessao["nova"] = 0  # coluna nova numa sessão não aparece nas outras
+    assert "nova" not in reg.obter("df", carregar).columns
+    assert np.shares_memory(sessao["Jan"].to_numpy(), reg.atual("df")["Jan"].to_numpy())
+
+
+def test_falha_na_carga_nao_fica_registrada():
+    reg = Registro()
+
+    def falhar():
+        raise FileNotFoundError("MaconhaV2.csv")
+
+    with pytest.raises(FileNotFoundError):
+        reg.obter("k", falhar)
+    assert reg.atual("k") is None
+    assert reg.obter("k", lambda: 1) == 1
+
+
+def test_trocar_e_invalidar():
+    reg = Registro(medir_copia=False)
+    antigo = reg.obter("k", lambda: {"v": 1})
+    reg.trocar("k", {"v": 2})
+    assert antigo["v"] == 1 and reg.obter("k", lambda: {"v": 3})["v"] == 2
+    reg.invalidar("k")
+    assert reg.obter("k", lambda: {"v": 3})["v"] == 3
+    reg.obter("j", lambda: 0)
+    reg.invalidar()
+    assert reg.estatisticas()["itens"] == 0
@@ -0,0 +1,166 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import planilha
+
+serie = pytest.importorskip("serie")
+if serie.pa is None:
+    pytest.skip("série histórica requer pyarrow", allow_module_level=True)
+
+import trat  # noqa: E402
+
+
+def total(base, droga="Maconha", ano=2024):
+    return serie.planilhas_ano(ano, base=base)[droga].set_index("Municipio")
+
+
+def envelhecer(path, segundos=86400):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - segundos * 1_000_000_000))
+
+
+def test_particao_float64(base_serie):
+    particao = base_serie / "ano=2024" / "droga=Maconha" / serie.ARQ_PLANILHA
+    assert serie.pq.read_schema(particao).field("kg").type == serie.pa.float64()
+    lido = serie.ler(anos=[2024], drogas=["Maconha"], base=base_serie)
+    np.testing.assert_array_equal(lido["kg"], lido["kg"].round(3))
+
+
+def test_csv_trocado_com_mtime_antigo_reimporta(tmp_path):
+    csv, base = tmp_path / "MaconhaV2.csv", tmp_path / "serie"
+    planilha(1).to_csv(csv, index=False)
+    assert serie.importar_planilhas(2024, {"Maconha": csv}, base) == ["Maconha"]
+    assert serie.importar_planilhas(2024, {"Maconha": csv}, base) == []
+    # cópia preservando a data (cp -p, mv, rsync -t): mtime mais velho que a partição
+    nova = planilha(1).assign(Jan=1.5)
+    nova.to_csv(csv, index=False)
+    envelhecer(csv)
+    assert serie.importar_planilhas(2024, {"Maconha": csv}, base) == ["Maconha"]
+    assert (total(base)["Jan"] == 1.5).all()
+
+
+def test_csv_tocado_com_mesmo_conteudo_nao_reimporta(tmp_path):
+    csv, base = tmp_path / "MaconhaV2.csv", tmp_path / "serie"
+    planilha(1).to_csv(csv, index=False)
+    serie.importar_planilhas(2024, {"Maconha": csv}, base)
+    envelhecer(csv)
+    assert serie.importar_planilhas(2024, {"Maconha": csv}, base) == []
+    particao = base / "ano=2024" / "droga=Maconha" / serie.ARQ_PLANILHA
+    meta = serie.pq.read_schema(particao).metadata
+    assert meta[b"fonte_mtime_ns"] == str(csv.stat().st_mtime_ns).encode()
+
+
+def test_particao_sem_fonte_e_refeita(tmp_path, base_serie, planilhas):
+    # partições gravadas antes (sem hash da fonte nos metadados) são refeitas uma vez
+    csv = tmp_path / "MaconhaV2.csv"
+    planilhas["Maconha"].to_csv(csv, index=False)
+    assert serie.importar_planilhas(2024, {"Maconha": csv}, base_serie) == ["Maconha"]
+    assert serie.importar_planilhas(2024, {"Maconha": csv}, base_serie) == []
+
+
+def test_consolidar_nao_sobrescreve_a_planilha(tmp_path, base_serie, planilhas):
+    base_diaria = tmp_path / "diaria"
+    planilha = base_serie / "ano=2024" / "droga=Maconha" / serie.ARQ_PLANILHA
+    conteudo = planilha.read_bytes()
+    lote = pd.DataFrame({"Municipio": ["CURITIBA", "CURITIBA", "PALMAS"],
+                         "dia": pd.to_datetime(["2024-03-05", "2024-03-20", "2024-07-01"]),
+                         "kg": [1.0, 0.5, 2.0]})
+    serie.gravar_lote_diario(lote, 2024, "Maconha", "l1", base_diaria)
+    serie.consolidar_mensal(2024, "Maconha", base_diaria, base_serie)
+
+    assert planilha.read_bytes() == conteudo
+    depois = total(base_serie)
+    origem = planilhas["Maconha"].set_index("Municipio")
+    assert depois.loc["CURITIBA", "Mar"] == pytest.approx(origem.loc["CURITIBA", "Mar"] + 1.5)
+    assert depois.loc["PALMAS", "Jul"] == pytest.approx(2.0)
+    assert depois["Total"].sum() == pytest.approx(origem["Total"].sum() + 3.5)
+
+
+def test_reimportar_planilha_mantem_ocorrencias(tmp_path, base_serie, planilhas):
+    base_diaria = tmp_path / "diaria"
+    lote = pd.DataFrame({"Municipio": ["CURITIBA"], "dia": pd.to_datetime(["2024-01-02"]), "kg": [4.0]})
+    serie.gravar_lote_diario(lote, 2024, "Maconha", "l1", base_diaria)
+    serie.consolidar_mensal(2024, "Maconha", base_diaria, base_serie)
+    nova = planilhas["Maconha"].assign(Jan=0.0)
+    serie.gravar_particao(nova, 2024, "Maconha", base_serie)
+    assert total(base_serie).loc["CURITIBA", "Jan"] == pytest.approx(4.0)
+
+
+def test_ingestao_de_ocorrencias_soma_a_planilha(tmp_path, base_serie, planilhas):
+    arquivo = tmp_path / "oc.csv"
+    arquivo.write_text("data,municipio,droga,kg\n2024-03-05,Curitiba,Maconha,1.0\n", encoding="utf-8")
+    antes = total(base_serie)["Total"].sum()
+    tocados = trat.ingerir_ocorrencias(arquivo, manifesto_path=tmp_path / "manifesto.json",
+                                       base_diaria=tmp_path / "diaria", base=base_serie)
+    assert tocados == [(2024, "Maconha")]
+    assert total(base_serie)["Total"].sum() == pytest.approx(antes + 1.0)
+    # rodar de novo sem acréscimos não muda nada
+    assert trat.ingerir_ocorrencias(arquivo, manifesto_path=tmp_path / "manifesto.json",
+                                    base_diaria=tmp_path / "diaria", base=base_serie) == []
+
+
+@pytest.fixture
+def ingerir(tmp_path, base_serie):
+    def ingerir(arquivo, **kwargs):
+        return trat.ingerir_ocorrencias(arquivo, manifesto_path=tmp_path / "manifesto.json",
+                                        base_diaria=tmp_path / "diaria", base=base_serie, **kwargs)
+    return ingerir
+
+
+def kg_diario(tmp_path):
+    diario = serie.ler_diario(base=tmp_path / "diaria")
+    return {} if diario.empty else diario.groupby("droga", observed=True)["kg"].sum().to_dict()
+
+
+def test_nova_tentativa_apos_falha_nao_duplica(tmp_path, ingerir, monkeypatch):
+    arquivo = tmp_path / "oc.csv"
+    arquivo.write_text("data,municipio,droga,kg\n2024-03-05,Curitiba,Maconha,1.0\n", encoding="utf-8")
+    ingerir(arquivo)
+    with open(arquivo, "a", encoding="utf-8") as f:
+        f.write("2024-03-06,Curitiba,Maconha,2.0\n")
+
+    def queda(*args, **kwargs):
+        raise RuntimeError("queda antes de gravar o manifesto")
+
+    with monkeypatch.context() as m:
+        m.setattr(trat, "gravar_manifesto", queda)
+        with pytest.raises(RuntimeError):
+            ingerir(arquivo)
+    # a exportação cresceu entre a queda e a nova tentativa
+    with open(arquivo, "a", encoding="utf-8") as f:
+        f.write("2024-03-07,Curitiba,Maconha,4.0\n")
+    ingerir(arquivo)
+    assert kg_diario(tmp_path) == {"Maconha": 7.0}
+    assert len(list((tmp_path / "diaria").rglob("*.parquet"))) == 2
+
+
+def test_forcar_reconsolida_drogas_que_sumiram(tmp_path, base_serie, ingerir):
+    arquivo = tmp_path / "oc.csv"
+    arquivo.write_text("data,municipio,droga,kg\n2024-03-05,Curitiba,Maconha,1.0\n"
+                       "2024-03-05,Curitiba,Crack,5.0\n", encoding="utf-8")
+    antes = total(base_serie, "Crack")["Total"].sum()
+    ingerir(arquivo)
+    # exportação corrigida sem a linha de Crack
+    arquivo.write_text("data,municipio,droga,kg\n2024-03-05,Curitiba,Maconha,1.0\n", encoding="utf-8")
+    assert ingerir(arquivo, forcar=True) == [(2024, "Crack"), (2024, "Maconha")]
+    assert total(base_serie, "Crack")["Total"].sum() == pytest.approx(antes)
+    assert not (base_serie / "ano=2024" / "droga=Crack" / serie.ARQ_OCORRENCIAS).exists()
+
+
+def test_forcar_com_arquivo_vazio_descarta_lotes(tmp_path, base_serie, ingerir, planilhas):
+    arquivo = tmp_path / "oc.csv"
+    arquivo.write_text("data,municipio,droga,kg\n2024-03-05,Curitiba,Maconha,1.0\n", encoding="utf-8")
+    ingerir(arquivo)
+    arquivo.write_text("data,municipio,droga,kg\n", encoding="utf-8")
+    assert ingerir(arquivo, forcar=True) == [(2024, "Maconha")]
+    assert kg_diario(tmp_path) == {}
+    assert total(base_serie)["Total"].sum() == pytest.approx(planilhas["Maconha"]["Total"].sum())
+
+
+def test_lote_diario_float64(tmp_path):
+    lote = pd.DataFrame({"Municipio": ["CASCAVEL"], "dia": pd.to_datetime(["2024-01-02"]), "kg": [36882.313]})
+    destino = serie.gravar_lote_diario(lote, 2024, "Maconha", "l1", tmp_path)
+    assert serie.pq.read_table(destino)["kg"].to_pylist() == [36882.313]
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dados
+import trat
+from dados import DATA_FILES
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+
+@pytest.mark.parametrize("droga", list(trat.FONTES))
+def test_converter_igual_as_planilhas_v2(tmp_path, droga):
+    destino = trat.converter(RAIZ / trat.FONTES[droga], tmp_path / DATA_FILES[droga], tamanho_bloco=37)
+    gerada, v2 = dados.ler_csv(destino), dados.ler_csv(RAIZ / DATA_FILES[droga])
+    assert gerada["Municipio"].tolist() == v2["Municipio"].tolist()
+    np.testing.assert_allclose(gerada.drop(columns="Municipio"), v2.drop(columns="Municipio"), atol=1e-9)
+
+
+def test_cabecalho_repetido_e_virgula_decimal(tmp_path):
+    bruto = tmp_path / "bruto.csv"
+    bruto.write_text(',Jan,Fev,Total\nCURITIBA,"1,5","2,25","3,75"\n'
+                     ',Jan,Fev,Total\n LONDRINA ,0,"0,001","0,001"\n', encoding="utf-8")
+    df = pd.read_csv(trat.converter(bruto, tmp_path / "V2.csv"))
+    assert df["Municipio"].tolist() == ["CURITIBA", "LONDRINA"]
+    assert df["Total"].tolist() == [3.75, 0.001]
+
+
+def test_validar_rejeita_total_divergente(tmp_path):
+    bruto = tmp_path / "bruto.csv"
+    bruto.write_text(',Jan,Fev,Total\nCURITIBA,"1,5","2,25","3,80"\n,"1,5","2,25","3,75"\n', encoding="utf-8")
+    destino = tmp_path / "V2.csv"
+    with pytest.raises(trat.ErroValidacao, match="CURITIBA"):
+        trat.converter(bruto, destino)
+    # falha no meio: nem destino nem temporário ficam para trás
+    assert list(tmp_path.iterdir()) == [bruto]
+
+
+def test_validar_dentro_da_tolerancia():
+    bloco = pd.DataFrame({"Municipio": ["CURITIBA"], "Jan": [1.0], "Fev": [2.0], "Total": [3.004]})
+    trat.validar(bloco, "teste")
+
+
+def test_manifesto_pula_fonte_sem_mudanca(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert trat.processar(["Crack"], compilar=False, origem_dir=RAIZ) == ["Crack"]
+    assert Path(DATA_FILES["Crack"]).exists()
+    assert trat.processar(["Crack"], compilar=False, origem_dir=RAIZ) == []
+    # V2 apagada: converte de novo mesmo com o hash igual
+    Path(DATA_FILES["Crack"]).unlink()
+    assert trat.processar(["Crack"], compilar=False, origem_dir=RAIZ) == ["Crack"]
+    assert trat.processar(["Crack"], forcar=True, compilar=False, origem_dir=RAIZ) == ["Crack"]
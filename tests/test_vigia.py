@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+import serie
+from conftest import planilha
+from dados import DATA_FILES
+from registro import Registro
+from vigia import Vigia, assinatura, recarregar_fonte
+
+
+def regravar(path, texto):
+    path.write_text(texto)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_dispara_so_com_assinatura_estavel(tmp_path):
+    csv = tmp_path / "MaconhaV2.csv"
+    csv.write_text("a")
+    chamadas = []
+    vigia = Vigia({"Maconha": csv}, lambda nome, path: chamadas.append(nome))
+    assert vigia.verificar() == []
+    regravar(csv, "ab")
+    assert vigia.verificar() == []          # mudou agora: espera a próxima leitura
+    regravar(csv, "abc")
+    assert vigia.verificar() == []          # ainda sendo escrito
+    assert vigia.verificar() == ["Maconha"]
+    assert vigia.verificar() == []
+    assert chamadas == ["Maconha"]
+
+
+def test_falha_tenta_de_novo(tmp_path):
+    csv = tmp_path / "CrackV2.csv"
+    csv.write_text("a")
+    tentativas = []
+
+    def ao_mudar(nome, path):
+        tentativas.append(nome)
+        if len(tentativas) == 1:
+            raise OSError("arquivo travado")
+
+    vigia = Vigia({"Crack": csv}, ao_mudar)
+    regravar(csv, "ab")
+    vigia.verificar()
+    assert vigia.verificar() == []          # falhou: a assinatura antiga continua valendo
+    assert vigia.verificar() == ["Crack"]
+    assert vigia.verificar() == []
+    assert tentativas == ["Crack", "Crack"]
+
+
+def test_arquivo_removido_nao_dispara(tmp_path):
+    csv = tmp_path / "CocainaV2.csv"
+    csv.write_text("a")
+    vigia = Vigia({"Cocaína": csv}, lambda nome, path: pytest.fail("não devia recarregar"))
+    csv.unlink()
+    assert vigia.verificar() == [] and vigia.verificar() == []
+
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    """Diretório de trabalho com as três planilhas V2, a série e o motor do ano montados."""
+    if serie.pa is None:
+        pytest.skip("recarga da série requer pyarrow")
+    monkeypatch.chdir(tmp_path)
+    for i, arquivo in enumerate(DATA_FILES.values()):
+        planilha(i + 1).to_csv(arquivo, index=False)
+    serie.importar_planilhas(2024)
+    planilhas, motores = Registro(), Registro(medir_copia=False)
+    from cubo import montar_motor
+
+    motores.obter(("motor", 2024), lambda: montar_motor(2024))
+    return planilhas, motores
+
+
+def test_recarga_de_csv_com_mtime_antigo(pasta):
+    planilhas, motores = pasta
+    antes = motores.atual(("motor", 2024)).totais("Maconha", ["CURITIBA"], ["Jan"])[0]
+    planilha(1).assign(Jan=planilha(1)["Jan"] + 1000).to_csv("MaconhaV2.csv", index=False)
+    st = os.stat("MaconhaV2.csv")
+    os.utime("MaconhaV2.csv", ns=(st.st_atime_ns, st.st_mtime_ns - 86400 * 1_000_000_000))
+    recarregar_fonte("Maconha", "MaconhaV2.csv", planilhas, motores)
+    novo = motores.atual(("motor", 2024))
+    assert novo.geracoes == {"Maconha": 1}
+    assert novo.totais("Maconha", ["CURITIBA"], ["Jan"])[0] == pytest.approx(antes + 1000)
+
+
+def test_lote_diario_em_replica_somente_leitura(pasta, monkeypatch):
+    planilhas, motores = pasta
+
+    def sem_escrita(*args, **kwargs):
+        raise PermissionError("serie/ montado só para leitura")
+
+    monkeypatch.setattr(serie, "consolidar_mensal", sem_escrita)
+    recarregar_fonte((2024, "Crack"), "serie_diaria/ano=2024/droga=Crack", planilhas, motores)
+    assert motores.atual(("motor", 2024)).geracoes == {"Crack": 1}
+
+
+def test_diretorio_e_fontes_dinamicas(tmp_path):
+    particao = tmp_path / "ano=2024" / "droga=Crack"
+    fontes = {}
+    vigia = Vigia(lambda: fontes, lambda nome, path: None)
+    particao.mkdir(parents=True)
+    (particao / "lote1.parquet").write_bytes(b"x")
+    fontes[(2024, "Crack")] = particao     # partição que apareceu depois do início
+    assert vigia.verificar() == []
+    assert vigia.verificar() == [(2024, "Crack")]
+    antes = assinatura(particao)
+    (particao / "lote2.parquet").write_bytes(b"yy")
+    assert assinatura(particao) != antes
+    assert vigia.verificar() == []
+    assert vigia.verificar() == [(2024, "Crack")]
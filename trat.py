@@ -1 +1,312 @@
-print("ok2")
\ No newline at end of file
+# trat.py
+# Ingestão: exportações brutas do estado (Maconha.csv, ...) -> planilhas V2 usadas pelo app.
+#
+# As exportações brutas têm a primeira coluna sem nome, decimais com vírgula e o
+# cabeçalho repetido a cada página. Aqui elas são lidas em blocos, validadas
+# (soma dos meses == Total) e gravadas de forma atômica. Entradas cujo conteúdo
+# não mudou desde a última execução são puladas.
+#
+# Além das planilhas V2 (ano corrente), cada conversão alimenta a série histórica
+# particionada (serie.py). Exportações de outros anos vão só para a série.
+#
+# Ocorrências individuais (data, municipio, droga, kg) em CSV ou JSONL entram por
+# --ocorrencias: o arquivo é lido em blocos de linhas (memória limitada), agregado por
+# município/dia e gravado como lote na base diária (serie.py); as partições mensais dos
+# anos/drogas tocados são consolidadas em seguida. O manifesto guarda até que byte cada
+# arquivo já foi lido: um arquivo que só cresce (exportação diária) é lido só no trecho novo.
+#
+# Uso:
+#   python trat.py                              # processa só o que mudou
+#   python trat.py --forcar                     # reprocessa tudo
+#   python trat.py --ano 2019 --dir brutos/2019 # carrega um ano antigo na série
+#   python trat.py --ocorrencias ocorrencias.jsonl
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+import dados
+import serie
+from dados import ANO_PADRAO, DATA_FILES
+from geo import chave_ascii
+
+# ------------------------------
+# Constantes
+# ------------------------------
+FONTES = {
+    "Maconha": "Maconha.csv",
+    "Cocaína": "Cocaina.csv",
+    "Crack": "Crack.csv",
+}
+MANIFESTO = Path(dados.CACHE_DIR) / "trat_manifesto.json"
+TAMANHO_BLOCO = 50_000
+TOLERANCIA_TOTAL = 0.005  # kg
+COLUNAS_OCORRENCIA = ("data", "municipio", "droga", "kg")
+JANELA_CONFERENCIA = 64 * 1024  # bytes antes do ponto de retomada conferidos por hash
+
+
+class ErroValidacao(ValueError):
+    pass
+
+
+# ------------------------------
+# Leitura em blocos
+# ------------------------------
+def ler_blocos(path, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera DataFrames já numéricos a partir da exportação bruta."""
+    with open(path, encoding="utf-8") as f:
+        cabecalho = f.readline().strip().split(",")
+    colunas = ["Municipio"] + cabecalho[1:]
+    leitor = pd.read_csv(
+        path, header=None, skiprows=1, names=colunas, dtype=str,
+        keep_default_na=False, chunksize=tamanho_bloco,
+    )
+    for bloco in leitor:
+        # o cabeçalho se repete no meio do arquivo (quebra de página da exportação)
+        bloco = bloco[bloco[colunas[1]] != colunas[1]].copy()
+        for col in colunas[1:]:
+            # decimal="," da exportação
+            bloco[col] = pd.to_numeric(bloco[col].str.replace(",", ".", regex=False))
+        bloco["Municipio"] = bloco["Municipio"].str.strip()
+        yield bloco
+
+
+def validar(bloco, origem):
+    meses = dados.colunas_mensais(bloco)
+    diferenca = (bloco[meses].sum(axis=1) - bloco["Total"]).abs()
+    ruins = bloco.loc[diferenca > TOLERANCIA_TOTAL, "Municipio"]
+    if len(ruins):
+        nomes = ", ".join(m or "(total geral)" for m in ruins.head(5))
+        raise ErroValidacao(f"{origem}: soma dos meses difere do Total em {len(ruins)} linha(s): {nomes}")
+
+
+# ------------------------------
+# Manifesto (pula entradas sem mudança)
+# ------------------------------
+def ler_manifesto(path=MANIFESTO):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def gravar_manifesto(manifesto, path=MANIFESTO):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ------------------------------
+# Conversão
+# ------------------------------
+def converter(origem, destino, tamanho_bloco=TAMANHO_BLOCO):
+    """Converte uma exportação bruta para o formato V2, de forma atômica."""
+    destino = Path(destino)
+    tmp = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            for i, bloco in enumerate(ler_blocos(origem, tamanho_bloco)):
+                validar(bloco, origem)
+                bloco.to_csv(f, index=False, header=(i == 0))
+        os.replace(tmp, destino)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return destino
+
+
+def processar(drogas=None, forcar=False, compilar=True, ano=ANO_PADRAO, origem_dir="."):
+    """Atualiza as planilhas V2 (e o cache colunar) e a série histórica das fontes que mudaram."""
+    manifesto = ler_manifesto()
+    feitos = []
+    for droga in drogas or FONTES:
+        origem = Path(origem_dir) / FONTES[droga]
+        chave = f"{ano}:{origem}"
+        h = dados.hash_arquivo(origem)
+        if not forcar and manifesto.get(chave) == h and (ano != ANO_PADRAO or Path(DATA_FILES[droga]).exists()):
+            continue
+        if ano == ANO_PADRAO:
+            destino = converter(origem, DATA_FILES[droga])
+            if compilar and dados.pa is not None:
+                dados.compilar_cache(destino)
+            if serie.pa is not None:
+                serie.gravar_particao(dados.ler_csv(destino), ano, droga, fonte=destino)
+        else:
+            # outros anos não mexem nas planilhas V2 do app: vão direto para a série
+            with tempfile.TemporaryDirectory() as tmp:
+                destino = converter(origem, Path(tmp) / DATA_FILES[droga])
+                serie.gravar_particao(dados.ler_csv(destino), ano, droga)
+        manifesto[chave] = h
+        gravar_manifesto(manifesto)
+        feitos.append(droga)
+    return feitos
+
+
+# ------------------------------
+# Ocorrências (streaming, com retomada)
+# ------------------------------
+def _hash_trecho(path, fim, janela=JANELA_CONFERENCIA):
+    """Hash dos bytes [fim - janela, fim): confere que o trecho já lido não foi reescrito."""
+    with open(path, "rb") as f:
+        f.seek(max(0, fim - janela))
+        return hashlib.sha256(f.read(fim - max(0, fim - janela))).hexdigest()
+
+
+def _linhas_em_blocos(path, inicio, tamanho_bloco):
+    """Blocos de linhas completas a partir do byte `inicio`, com o byte em que cada bloco termina."""
+    with open(path, "rb") as f:
+        f.seek(inicio)
+        bloco, fim = [], inicio
+        for linha in iter(f.readline, b""):
+            if not linha.endswith(b"\n"):
+                break  # linha ainda sendo escrita: fica para a próxima execução
+            fim += len(linha)
+            if linha.strip():
+                bloco.append(linha)
+            if len(bloco) >= tamanho_bloco:
+                yield b"".join(bloco), fim
+                bloco = []
+        if bloco:
+            yield b"".join(bloco), fim
+
+
+def _normalizar_ocorrencias(bloco, origem):
+    faltando = [c for c in COLUNAS_OCORRENCIA if c not in bloco.columns]
+    if faltando:
+        raise ErroValidacao(f"{origem}: colunas ausentes: {', '.join(faltando)}")
+    drogas = {chave_ascii(d): d for d in DATA_FILES}
+    droga = bloco["droga"].astype(str).map(lambda d: drogas.get(chave_ascii(d)))
+    if droga.isna().any():
+        desconhecidas = sorted(set(bloco.loc[droga.isna(), "droga"].astype(str)))[:5]
+        raise ErroValidacao(f"{origem}: droga desconhecida: {', '.join(desconhecidas)}")
+    kg = pd.to_numeric(bloco["kg"].astype(str).str.replace(",", ".", regex=False), errors="coerce")
+    dia = pd.to_datetime(bloco["data"], format="ISO8601", errors="coerce")
+    ruins = kg.isna() | (kg < 0) | dia.isna()
+    if ruins.any():
+        raise ErroValidacao(f"{origem}: {int(ruins.sum())} ocorrência(s) com data ou kg inválidos")
+    return pd.DataFrame({
+        "droga": droga,
+        "Municipio": bloco["municipio"].astype(str).map(chave_ascii),
+        "dia": dia.dt.normalize(),
+        "kg": kg,
+    })
+
+
+def ler_ocorrencias(path, inicio=0, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera (ocorrências normalizadas, byte final) a partir do byte `inicio` de um CSV ou JSONL."""
+    path = Path(path)
+    jsonl = path.suffix.lower() in (".jsonl", ".ndjson")
+    if not jsonl:
+        with open(path, "rb") as f:
+            cabecalho = f.readline()
+        colunas = [c.strip().lower() for c in cabecalho.decode("utf-8-sig").split(",")]
+        inicio = max(inicio, len(cabecalho))
+    for texto, fim in _linhas_em_blocos(path, inicio, tamanho_bloco):
+        if jsonl:
+            bloco = pd.read_json(io.BytesIO(texto), lines=True, dtype=False)
+            bloco.columns = [str(c).lower() for c in bloco.columns]
+        else:
+            bloco = pd.read_csv(io.BytesIO(texto), header=None, names=colunas, dtype=str, keep_default_na=False)
+        yield _normalizar_ocorrencias(bloco, path), fim
+
+
+def ingerir_ocorrencias(path, forcar=False, manifesto_path=MANIFESTO, base_diaria=None, base=None,
+                        tamanho_bloco=TAMANHO_BLOCO):
+    """Acrescenta à base diária as ocorrências novas de um arquivo e reconsolida os meses tocados.
+
+    Devolve os pares (ano, droga) atualizados. Memória: um bloco de linhas + o agregado
+    município × dia do trecho novo.
+    """
+    base_diaria = base_diaria or serie.SERIE_DIARIA_DIR
+    base = base or serie.SERIE_DIR
+    path = Path(path)
+    manifesto = ler_manifesto(manifesto_path)
+    chave = f"ocorrencias:{path.resolve()}"
+    estado = manifesto.get(chave, {})
+    inicio = 0 if forcar else estado.get("bytes", 0)
+    if inicio:
+        if path.stat().st_size < inicio or _hash_trecho(path, inicio) != estado.get("sha_trecho"):
+            raise ErroValidacao(f"{path}: o trecho já ingerido mudou (o arquivo não é só de acréscimos); use --forcar")
+
+    # agregado incremental por (droga, Municipio, dia): cresce com os dias, não com as ocorrências
+    acumulado = None
+    fim = inicio
+    for bloco, fim in ler_ocorrencias(path, inicio, tamanho_bloco):
+        parcial = bloco.groupby(["droga", "Municipio", "dia"], as_index=False)["kg"].sum()
+        acumulado = parcial if acumulado is None else (
+            pd.concat([acumulado, parcial]).groupby(["droga", "Municipio", "dia"], as_index=False)["kg"].sum()
+        )
+
+    # o lote é o trecho a partir de `inicio`: uma nova tentativa após falha (manifesto não gravado)
+    # substitui o lote da tentativa anterior, mesmo que o arquivo tenha crescido nesse meio-tempo
+    prefixo = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:8]
+    lote = f"{prefixo}-{inicio}"
+    # reingestão completa: descarta todos os lotes anteriores deste arquivo
+    padrao = f"{prefixo}-*.parquet" if forcar else f"{lote}.parquet"
+    tocados = set()
+    for antigo in Path(base_diaria).glob(f"ano=*/droga=*/{padrao}"):
+        tocados.add((int(antigo.parent.parent.name.split("=", 1)[1]), antigo.parent.name.split("=", 1)[1]))
+        antigo.unlink()
+    if acumulado is not None:
+        for (ano, droga), parte in acumulado.groupby([acumulado["dia"].dt.year, "droga"]):
+            serie.gravar_lote_diario(parte, ano, droga, lote, base_diaria)
+            tocados.add((int(ano), droga))
+    if not tocados:
+        return []
+    # reconsolida também os pares que só tinham lotes descartados
+    for ano, droga in sorted(tocados):
+        serie.consolidar_mensal(ano, droga, base_diaria, base)
+
+    manifesto[chave] = {"bytes": fim, "sha_trecho": _hash_trecho(path, fim)}
+    gravar_manifesto(manifesto, manifesto_path)
+    return sorted(tocados)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera as planilhas V2 a partir das exportações brutas.")
+    parser.add_argument("drogas", nargs="*", help=f"drogas a processar (padrão: todas): {', '.join(FONTES)}")
+    parser.add_argument("--forcar", action="store_true", help="reprocessa mesmo sem mudança no conteúdo")
+    parser.add_argument("--sem-cache", action="store_true", help="não recompila o cache colunar")
+    parser.add_argument("--ano", type=int, default=ANO_PADRAO, help=f"ano das exportações (padrão: {ANO_PADRAO})")
+    parser.add_argument("--dir", default=".", help="diretório com as exportações brutas")
+    parser.add_argument("--ocorrencias", nargs="+", metavar="ARQUIVO",
+                        help="arquivos CSV/JSONL de ocorrências (data, municipio, droga, kg) a acrescentar")
+    args = parser.parse_args(argv)
+    if args.ocorrencias:
+        if serie.pa is None:
+            parser.error("--ocorrencias exige pyarrow (série histórica)")
+        try:
+            tocados = [t for arq in args.ocorrencias for t in ingerir_ocorrencias(arq, forcar=args.forcar)]
+        except ErroValidacao as e:
+            print(f"Erro de validação: {e}", file=sys.stderr)
+            return 1
+        print("Atualizados: " + (", ".join(f"{d} {a}" for a, d in sorted(set(tocados))) or "nenhum (sem ocorrências novas)"))
+        return 0
+    if args.ano != ANO_PADRAO and serie.pa is None:
+        parser.error("anos diferentes do padrão exigem pyarrow (série histórica)")
+    desconhecidas = [d for d in args.drogas if d not in FONTES]
+    if desconhecidas:
+        parser.error(f"droga desconhecida: {', '.join(desconhecidas)}")
+
+    try:
+        feitos = processar(args.drogas or None, forcar=args.forcar, compilar=not args.sem_cache,
+                           ano=args.ano, origem_dir=args.dir)
+    except ErroValidacao as e:
+        print(f"Erro de validação: {e}", file=sys.stderr)
+        return 1
+    print("Atualizados: " + (", ".join(feitos) if feitos else "nenhum (sem mudanças)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
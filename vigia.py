@@ -0,0 +1,144 @@
+# vigia.py
+# Recarga a quente das planilhas: acompanha (mtime, tamanho) dos CSVs por polling e avisa
+# quando um deles foi trocado (trat.py ou um operador soltando um MaconhaV2.csv novo).
+# Diretórios (partições da base diária) também valem: a assinatura cobre os arquivos de dentro,
+# então um lote novo de ocorrências conta como mudança.
+#
+# Sem inotify: o polling funciona igual em volume de rede/contêiner e custa um stat por
+# arquivo a cada INTERVALO_S. Uma mudança só dispara depois de a assinatura ficar estável
+# em duas leituras seguidas, para não recarregar um arquivo no meio da cópia.
+import logging
+import os
+import threading
+from contextlib import nullcontext
+
+import dados
+import exportacao
+import serie
+from cubo import montar_motor
+from dados import ANO_PADRAO, DATA_FILES
+
+log = logging.getLogger("vigia")
+
+INTERVALO_S = float(os.environ.get("VIGIA_INTERVALO_S", "5"))
+
+
+def assinatura(path):
+    """(mtime_ns, tamanho) do arquivo, ou (maior mtime_ns, nº de arquivos, soma dos tamanhos)
+    de um diretório; None se não existe."""
+    try:
+        st = os.stat(path)
+        if not os.path.isdir(path):
+            return st.st_mtime_ns, st.st_size
+        arquivos = [e.stat() for e in os.scandir(path) if e.is_file() and not e.name.startswith(".")]
+    except OSError:
+        return None
+    return (max((a.st_mtime_ns for a in arquivos), default=st.st_mtime_ns), len(arquivos),
+            sum(a.st_size for a in arquivos))
+
+
+class Vigia:
+    """Thread que chama ao_mudar(nome, path) para cada arquivo trocado; um arquivo por vez.
+
+    `arquivos` é um dict nome -> caminho ou uma função que o devolve (relida a cada passada,
+    para acompanhar partições que aparecem depois). Se ao_mudar falha, a assinatura antiga
+    fica valendo e a recarga é tentada de novo no próximo ciclo.
+    """
+
+    def __init__(self, arquivos, ao_mudar, intervalo=INTERVALO_S):
+        self.arquivos = arquivos
+        self.ao_mudar = ao_mudar
+        self.intervalo = intervalo
+        self._vistas = {nome: assinatura(p) for nome, p in self._fontes().items()}
+        self._pendentes = {}
+        self._parar = threading.Event()
+        self._thread = None
+
+    def verificar(self):
+        """Uma passada de polling; devolve os nomes recarregados."""
+        recarregados = []
+        for nome, path in self._fontes().items():
+            atual = assinatura(path)
+            if atual is None or atual == self._vistas.get(nome):
+                self._pendentes.pop(nome, None)
+                continue
+            if self._pendentes.get(nome) != atual:
+                self._pendentes[nome] = atual  # mudou agora: espera a próxima leitura
+                continue
+            try:
+                self.ao_mudar(nome, path)
+            except Exception:
+                log.exception("recarga de %s falhou; nova tentativa no próximo ciclo", path)
+                continue
+            self._vistas[nome] = atual
+            del self._pendentes[nome]
+            recarregados.append(nome)
+        return recarregados
+
+    def _fontes(self):
+        return dict(self.arquivos() if callable(self.arquivos) else self.arquivos)
+
+    def _rodar(self):
+        while not self._parar.wait(self.intervalo):
+            self.verificar()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._rodar, name="vigia-planilhas", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+
+
+# ------------------------------
+# Recarga (app e API)
+# ------------------------------
+def fontes_vigiadas():
+    """CSVs V2 (nome = droga) e partições da base diária (nome = (ano, droga))."""
+    fontes = dict(DATA_FILES)
+    if serie.pa is not None:
+        fontes.update(serie.particoes_diarias())
+    return fontes
+
+
+def recarregar_fonte(nome, path, planilhas, motores, figs=None, met=None):
+    """Relê só a fonte trocada e troca o motor do ano de uma vez (roda na thread do vigia).
+
+    `planilhas` e `motores` são registro.Registro com as chaves ("planilha", path) e ("motor", ano);
+    as outras planilhas saem do registro sem reler o disco. O motor novo ganha a geração da
+    droga + 1 (todas, se os índices de município/mês mudaram): figuras e exportações ainda em
+    construção a partir do motor antigo ficam com a chave velha e nunca mais são servidas.
+    """
+    ano, droga = nome if isinstance(nome, tuple) else (ANO_PADRAO, nome)
+    with met.medir("recarga", droga=droga) if met else nullcontext():
+        if isinstance(nome, tuple):
+            # o trat.py já consolida depois de gravar o lote; refazer aqui cobre uma falha entre os dois
+            try:
+                serie.consolidar_mensal(ano, droga)
+            except OSError:
+                pass  # réplica com serie/ só de leitura: usa o mensal que já está lá
+        else:
+            planilhas.trocar(("planilha", path), dados.carregar(path))
+            if serie.pa is not None:
+                try:
+                    # o vigia já decidiu que o arquivo mudou: não depende da data do CSV
+                    serie.importar_planilhas(ANO_PADRAO, {droga: path}, forcar=True)
+                except OSError:
+                    pass
+        antigo = motores.atual(("motor", ano))
+        mesmos_indices = True
+        if antigo is not None:
+            novo = montar_motor(ano, carregar=lambda p: planilhas.obter(("planilha", p), lambda: dados.carregar(p)))
+            # as chaves de cache usam índices de município/mês: se mudaram, nada do ano vale mais
+            mesmos_indices = (list(antigo.municipios) == list(novo.municipios) and antigo.meses == novo.meses
+                              and antigo.drogas == novo.drogas)
+            alteradas = [droga] if mesmos_indices else set(novo.drogas) | set(antigo.geracoes)
+            novo.geracoes = {**antigo.geracoes, **{d: antigo.geracao(d) + 1 for d in alteradas}}
+            motores.trocar(("motor", ano), novo)
+        if figs is not None:
+            figs.invalidar(ano, droga if mesmos_indices else None)
+        exportacao.invalidar(ano, droga if mesmos_indices else None)
+    if met:
+        met.contar("recargas_total", droga=droga)